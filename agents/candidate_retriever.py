@@ -0,0 +1,112 @@
+import re
+import threading
+from collections import namedtuple
+import numpy as np
+from agents.logger import get_logger
+from agents.model_catalog import model_name
+
+logger = get_logger("candidate_retriever", "logs/candidate_retriever.log")
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def _flatten(value):
+    if isinstance(value, dict):
+        return " ".join(_flatten(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_flatten(v) for v in value)
+    return str(value)
+
+
+def model_document(model):
+    """Text a catalog entry is indexed under: every field value, name boosted."""
+    name = model_name(model)
+    return f"{name} {name} {_flatten(model)}"
+
+
+# One built index. Never mutated: a rebuild swaps in a new one.
+_Index = namedtuple("_Index", ["models", "vocab", "weights", "version"])
+
+
+class CandidateRetriever:
+    """BM25 index over the model catalog, used to shortlist models before the LLM.
+
+    Term weights are precomputed into a dense (models x vocabulary) matrix at
+    build time, so scoring a query is a column gather and a row sum. Readers
+    take one reference to the current ``_Index``, so a concurrent rebuild
+    never mixes one catalog's vocabulary with another's weights.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._index = _Index((), {}, np.zeros((0, 0), dtype=np.float32), None)
+
+    @property
+    def version(self):
+        return self._index.version
+
+    def build(self, models, version=None):
+        docs = [tokenize(model_document(m)) for m in models]
+        vocab = {}
+        for tokens in docs:
+            for token in tokens:
+                vocab.setdefault(token, len(vocab))
+
+        tf = np.zeros((len(docs), len(vocab)), dtype=np.float32)
+        for row, tokens in enumerate(docs):
+            for token in tokens:
+                tf[row, vocab[token]] += 1
+
+        n_docs = max(len(docs), 1)
+        doc_len = tf.sum(axis=1, keepdims=True)
+        avg_len = float(doc_len.mean()) if len(docs) else 1.0
+        df = (tf > 0).sum(axis=0)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / max(avg_len, 1e-9))
+        weights = idf * (tf * (self.k1 + 1)) / (tf + norm)
+
+        weights.setflags(write=False)
+        self._index = _Index(tuple(models), vocab, weights, version)
+        logger.info(f"✅ Built BM25 index: {len(docs)} models, {len(vocab)} terms (catalog version {version}).")
+
+    def ensure_built(self, models, version):
+        index = self._index
+        if index.version == version and index.models:
+            return
+        with self._lock:
+            index = self._index
+            if index.version != version or not index.models:
+                self.build(models, version)
+
+    def scores(self, query, index=None):
+        if index is None:
+            index = self._index
+        columns = sorted({index.vocab[t] for t in tokenize(query) if t in index.vocab})
+        if not columns:
+            return np.zeros(len(index.models), dtype=np.float32)
+        return index.weights[:, columns].sum(axis=1)
+
+    def top_k(self, query, k, exclude=None):
+        """Return up to ``k`` models ranked by BM25 score against ``query``."""
+        index = self._index
+        scores = self.scores(query, index)
+        if exclude:
+            excluded = {i for i, m in enumerate(index.models) if model_name(m) == exclude}
+            for i in excluded:
+                scores[i] = -np.inf
+        # Stable sort keeps catalog order among ties (e.g. when nothing matches).
+        order = np.argsort(-scores, kind="stable")
+        return [index.models[i] for i in order[:k] if np.isfinite(scores[i])]
+
+
+_retriever = CandidateRetriever()
+
+
+def get_candidate_retriever():
+    return _retriever
@@ -1,20 +1,26 @@
 import os
-import json
-import docx
-import csv
-import pandas as pd
-import pytesseract
-import speech_recognition as sr
-from PIL import Image
-import PyPDF2
-from agents.logger import get_logger
+from agents.logger import get_logger, log_payload
+from agents.metrics import timed
+from agents.file_readers import read_file
+from agents.tokens import record_usage
+from agents.intent_classifier import PROCEED, typed_message
+from agents.follow_up_resolver import resolve_follow_up
+from agents.prompt_encoding import check_prompt, compact_record, prompt_budget, truncate_tokens
 
 logger = get_logger("chat_agent", "logs/chat_agent.log")
 
+PROCEED_MESSAGE = "Great, I will now suggest the most suitable AI models for your case."
+HOLD_MESSAGE = (
+    "Hi! I help you choose the right AI model. Tell me what you want to use AI for, "
+    "e.g. summarizing documents, transcribing audio or generating images."
+)
+
 
 class ChatAgent:
-    def __init__(self, gpt_client):
+    def __init__(self, gpt_client, summarizer=None, intent_classifier=None):
         self.client = gpt_client
+        self.summarizer = summarizer
+        self.intent_classifier = intent_classifier
         self.selected_model_info = None
         self.last_user_task = None
 
@@ -24,22 +30,26 @@ class ChatAgent:
     def set_last_user_task(self, task):
         self.last_user_task = task
 
+    @timed("follow_up")
     def handle_follow_up(self, user_input):
         """Respond to follow-up question about previously recommended model."""
         if not self.selected_model_info or not self.last_user_task:
             return "No model has been selected yet or original task is missing."
 
+        # Price/region/provider/speed/accuracy questions are answered from the catalog fields directly
+        answer = resolve_follow_up(user_input, self.selected_model_info)
+        if answer:
+            return answer
+
         system_prompt = (
             "You are an AI assistant that previously recommended a model to the user for a specific task.\n"
-            f"User Task: {self.last_user_task}\n\n"
-            f"Recommended Model:\n{json.dumps(self.selected_model_info, indent=2)}\n\n"
+            f"User Task: {truncate_tokens(self.last_user_task, prompt_budget('follow_up') // 2)}\n\n"
+            f"Recommended Model:\n{compact_record(self.selected_model_info)}\n\n"
             "Now the user is asking a follow-up question. Respond strictly based on the model above.\n"
             "- If the user asks about pricing (e.g. cost per image), extract the relevant part from the model pricing.\n"
             "- If the user asks about availability or region (e.g. India), use the 'Region' field.\n"
             "- Be specific, concise, and informative. Do not say you can't help.\n"
             "- Do not repeat all model details again.\n"
-            "User follow-up:\n"
-            f"{user_input.strip()}"
         )
 
         try:
@@ -47,107 +57,24 @@ class ChatAgent:
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_input.strip()}
             ]
+            check_prompt("follow_up", messages)
             response = self.client.chat.completions.create(
                 model="gpt-4o",
                 messages=messages
             )
+            record_usage("follow_up", response.usage)
             return response.choices[0].message.content.strip()
         except Exception as e:
             logger.error(f"Follow-up error: {e}")
             return "Sorry, I couldn’t answer your follow-up right now."
 
     # ===== File Readers =====
-    def _read_text_file(self, path):
-        try:
-            with open(path, 'r', encoding="utf-8") as f:
-                return f.read()
-        except Exception as e:
-            logger.error(f"Text read error: {e}")
-            return ""
-
-    def _read_docx_file(self, path):
-        try:
-            doc = docx.Document(path)
-            return "\n".join([para.text for para in doc.paragraphs])
-        except Exception as e:
-            logger.error(f"DOCX read error: {e}")
-            return ""
-
-    def _read_pdf_file(self, path):
-        try:
-            with open(path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                return "\n".join(page.extract_text() for page in reader.pages if page.extract_text())
-        except Exception as e:
-            logger.error(f"PDF read error: {e}")
-            return ""
-
-    def _read_csv_file(self, path):
-        try:
-            with open(path, 'r', encoding="utf-8") as f:
-                reader = csv.reader(f)
-                return "\n".join([", ".join(row) for row in reader])
-        except Exception as e:
-            logger.error(f"CSV read error: {e}")
-            return ""
-
-    def _read_xlsx_file(self, path):
-        try:
-            df = pd.read_excel(path)
-            return df.to_string(index=False)
-        except Exception as e:
-            logger.error(f"XLSX read error: {e}")
-            return ""
-
-    def _read_json_file(self, path):
-        try:
-            with open(path, 'r') as f:
-                return json.dumps(json.load(f), indent=2)
-        except Exception as e:
-            logger.error(f"JSON read error: {e}")
-            return ""
-
-    def _read_image_file(self, path):
-        try:
-            img = Image.open(path)
-            return pytesseract.image_to_string(img)
-        except Exception as e:
-            logger.error(f"Image OCR error: {e}")
-            return ""
-
-    def _read_audio_file(self, path):
-        recognizer = sr.Recognizer()
-        try:
-            with sr.AudioFile(path) as source:
-                audio_data = recognizer.record(source)
-                return recognizer.recognize_google(audio_data)
-        except Exception as e:
-            logger.error(f"Audio read error: {e}")
-            return ""
-
     def _read_file_content(self, file_path):
-        ext = os.path.splitext(file_path)[-1].lower()
-        if ext == '.txt':
-            return self._read_text_file(file_path)
-        elif ext == '.docx':
-            return self._read_docx_file(file_path)
-        elif ext == '.pdf':
-            return self._read_pdf_file(file_path)
-        elif ext == '.csv':
-            return self._read_csv_file(file_path)
-        elif ext == '.xlsx':
-            return self._read_xlsx_file(file_path)
-        elif ext == '.json':
-            return self._read_json_file(file_path)
-        elif ext in ['.png', '.jpg', '.jpeg']:
-            return self._read_image_file(file_path)
-        elif ext in ['.wav', '.mp3']:
-            return self._read_audio_file(file_path)
-        else:
-            logger.warning(f"Unsupported file type: {ext}")
-            return ""
+        # Readers live in agents.file_readers and import their backend on first use.
+        return read_file(file_path)
 
     # ===== Main Input Processor =====
+    @timed("gatekeeper")
     def process_web_input(self, user_input):
         try:
             if not user_input or not user_input.strip():
@@ -172,13 +99,17 @@ class ChatAgent:
 
             # Collect full content (text + files)
             collected = ""
+            typed = []
             for line in user_input.strip().splitlines():
                 line = line.strip()
                 if os.path.exists(line):
                     content = self._read_file_content(line)
+                    if self.summarizer:
+                        content = self.summarizer.condense(content)
                     collected += f"\n{content}"
                 else:
                     collected += f"\n{line}"
+                    typed.append(line)
 
             if not collected.strip():
                 return {
@@ -186,6 +117,20 @@ class ChatAgent:
                     "message": "No valid input found in text or files."
                 }
 
+            # Clear cases are decided locally from what the user typed (never from file text); the rest go to GPT
+            typed_text = typed_message("\n".join(typed))
+            decision = self.intent_classifier.classify(typed_text) if self.intent_classifier and typed_text else None
+            if decision:
+                label, source = decision
+                logger.info(f"⚡ Intent '{label}' decided locally ({source}).")
+                if label == PROCEED:
+                    self.set_last_user_task(user_input.strip())
+                return {
+                    "proceed": label == PROCEED,
+                    "message": PROCEED_MESSAGE if label == PROCEED else HOLD_MESSAGE,
+                    "intent_source": source
+                }
+
             # Ask GPT if it's a valid AI task
             messages = [
                 {
@@ -197,27 +142,31 @@ class ChatAgent:
                         "If it's not valid for model recommendation (e.g. greetings, jokes), reply politely and end with ##HOLD##."
                     )
                 },
-                {"role": "user", "content": collected.strip()}
+                {"role": "user", "content": truncate_tokens(collected.strip(), prompt_budget("gatekeeper"))}
             ]
+            check_prompt("gatekeeper", messages)
 
             response = self.client.chat.completions.create(
                 model="gpt-4o",
                 messages=messages
             )
 
+            record_usage("gatekeeper", response.usage)
             result = response.choices[0].message.content.strip()
-            logger.info("Web input analysis result:\n" + result)
+            log_payload(logger, "Web input analysis result", result)
 
             if "##PROCEED##" in result:
                 self.set_last_user_task(user_input.strip())  # Save original task
                 return {
                     "proceed": True,
-                    "message": result.replace("##PROCEED##", "").strip()
+                    "message": result.replace("##PROCEED##", "").strip(),
+                    "intent_source": "llm"
                 }
             else:
                 return {
                     "proceed": False,
-                    "message": result.replace("##HOLD##", "").strip()
+                    "message": result.replace("##HOLD##", "").strip(),
+                    "intent_source": "llm"
                 }
 
         except Exception as e:
@@ -0,0 +1,149 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from pymongo.errors import BulkWriteError, PyMongoError
+from agents.logger import get_logger
+
+logger = get_logger("chat_persistence", "logs/chat_persistence.log")
+
+
+class ChatWriter:
+    """Write-behind persistence for chat turns.
+
+    ``write`` only enqueues. A background thread batches queued turns into
+    ``insert_many``, flushing when ``batch_size`` turns are waiting or
+    ``flush_interval`` seconds have passed. Failed batches are retried a
+    few times. The queue is drained at interpreter exit. When the queue is
+    full, ``write`` falls back to a synchronous insert rather than drop.
+    ``delete_many`` runs on the same thread, after every turn queued before
+    it has been inserted, so deleted turns can't reappear from the queue.
+
+    Other workers have queues of their own, so ``clear`` also records a
+    per-user ``cleared_at`` in ``clears``: every writer drops turns stamped
+    before it, and history reads filter on it (``cleared_at``).
+    """
+
+    def __init__(self, collection, batch_size=50, flush_interval=1.0, max_queue=10000, max_retries=3, clears=None):
+        self.collection = collection
+        self.clears = clears
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, doc):
+        try:
+            self._queue.put_nowait(doc)
+        except queue.Full:
+            logger.warning("⚠️ Chat write queue full. Writing synchronously.")
+            self._insert([doc])
+
+    def clear(self, username, timeout=10):
+        """Delete a user's turns, including ones still queued here or in another worker."""
+        if self.clears is not None:
+            self.clears.update_one({"_id": username}, {"$set": {"cleared_at": datetime.utcnow()}}, upsert=True)
+        return self.delete_many({"username": username}, timeout=timeout)
+
+    def cleared_at(self, username):
+        if self.clears is None:
+            return None
+        doc = self.clears.find_one({"_id": username})
+        return doc["cleared_at"] if doc else None
+
+    def delete_many(self, query, timeout=10):
+        """Delete matching turns once everything queued so far is written; returns the deleted count."""
+        command = _Delete(query)
+        self._queue.put(command, timeout=timeout)
+        if not command.done.wait(timeout):
+            raise TimeoutError(f"Chat delete not applied within {timeout}s")
+        if command.error is not None:
+            raise command.error
+        return command.deleted
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if isinstance(item, _Delete):
+                    if batch:
+                        self._insert(batch)
+                        batch = []
+                    item.apply(self.collection)
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._insert(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+        if batch:
+            self._insert(batch)
+
+    def _drop_cleared(self, batch):
+        """Drop turns stamped before their user's last clear (queued here while another worker cleared)."""
+        if self.clears is None:
+            return batch
+        try:
+            clears = {
+                doc["_id"]: doc["cleared_at"]
+                for doc in self.clears.find({"_id": {"$in": list({turn.get("username") for turn in batch})}})
+            }
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Could not check chat clears: {e}")
+            return batch  # history reads still filter on cleared_at
+        kept = [turn for turn in batch if not (turn.get("username") in clears and turn["timestamp"] <= clears[turn["username"]])]
+        if len(kept) < len(batch):
+            logger.info(f"🧹 Dropped {len(batch) - len(kept)} chat turn(s) written before a clear.")
+        return kept
+
+    def _insert(self, batch):
+        batch = self._drop_cleared(batch)
+        if not batch:
+            return
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.collection.insert_many(batch, ordered=False)
+                logger.debug("💾 Flushed %d chat turn(s).", len(batch))
+                return
+            except BulkWriteError as e:
+                # insert_many assigned _ids on the first attempt; duplicates mean "already written".
+                errors = e.details.get("writeErrors", [])
+                if all(err.get("code") == 11000 for err in errors):
+                    return
+                logger.warning(f"⚠️ Chat batch partially failed (attempt {attempt}/{self.max_retries}): {len(errors)} error(s)")
+                time.sleep(0.5 * attempt)
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Chat batch insert failed (attempt {attempt}/{self.max_retries}): {e}")
+                time.sleep(0.5 * attempt)
+        logger.error(f"❌ Dropped {len(batch)} chat turn(s) after {self.max_retries} failed attempts.")
+
+    def close(self, timeout=10):
+        """Signal the writer to stop and wait for it to drain the queue."""
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+class _Delete:
+    def __init__(self, query):
+        self.query = query
+        self.done = threading.Event()
+        self.deleted = 0
+        self.error = None
+
+    def apply(self, collection):
+        try:
+            self.deleted = collection.delete_many(self.query).deleted_count
+        except PyMongoError as e:
+            self.error = e
+        finally:
+            self.done.set()
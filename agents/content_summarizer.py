@@ -0,0 +1,170 @@
+import contextvars
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pymongo.errors import PyMongoError
+from agents.logger import get_logger
+from agents.metrics import timed
+from agents.prompt_encoding import truncate_tokens
+from agents.tokens import count_tokens, record_usage
+
+logger = get_logger("content_summarizer", "logs/content_summarizer.log")
+
+MAP_PROMPT = (
+    "You are condensing part {index} of {total} of a document a user attached while asking for an AI model "
+    "recommendation. Keep every fact that matters for choosing a model: the task, data types and formats, "
+    "volumes, languages, quality, latency, budget, compliance and deployment constraints. "
+    "Drop boilerplate. Respond with a compact plain-text summary."
+)
+REDUCE_PROMPT = (
+    "Merge these partial summaries of one document into a single concise summary. Keep every requirement, "
+    "constraint and number that matters for choosing an AI model; remove repetition."
+)
+
+
+class ContentSummarizer:
+    """Map-reduce condensation of oversized extracted file content.
+
+    Text within ``max_tokens`` passes through untouched. Larger text is split
+    into ``chunk_tokens`` pieces on paragraph boundaries, the pieces are
+    summarized concurrently on a bounded thread pool, and the partial
+    summaries are merged (recursively, if they are still too long). Results
+    are cached by content hash in memory and, optionally, in Mongo.
+    """
+
+    def __init__(self, gpt_client, max_tokens=6000, chunk_tokens=3000, max_workers=4, collection=None, memory_entries=64):
+        self.client = gpt_client
+        self.max_tokens = max_tokens
+        self.chunk_tokens = chunk_tokens
+        self.collection = collection
+        self.memory_entries = memory_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarizer")
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+
+    @timed("summarizer")
+    def condense(self, text):
+        if not text or count_tokens(text) <= self.max_tokens:
+            return text
+
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        cached = self._cached(key)
+        if cached is not None:
+            logger.info(f"♻️ Summary cache hit for {key[:12]}.")
+            return cached
+
+        summary, complete = self._reduce(*self._map(text))
+        if complete:
+            self._store(key, summary)
+        else:
+            logger.warning(f"⚠️ Summary for {key[:12]} contains raw excerpts from failed calls. Not caching it.")
+        return summary
+
+    # ===== Map / Reduce =====
+    def _chunks(self, text):
+        chunks, current, used = [], [], 0
+        for paragraph in text.split("\n"):
+            size = count_tokens(paragraph)
+            if size > self.chunk_tokens:
+                # A single huge paragraph (e.g. a flattened table): hard-split it by characters.
+                step = max(1, len(paragraph) * self.chunk_tokens // size)
+                pieces = [paragraph[i:i + step] for i in range(0, len(paragraph), step)]
+            else:
+                pieces = [paragraph]
+            for piece in pieces:
+                piece_size = count_tokens(piece)
+                if current and used + piece_size > self.chunk_tokens:
+                    chunks.append("\n".join(current))
+                    current, used = [], 0
+                current.append(piece)
+                used += piece_size
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
+
+    # Each step returns ``(text, complete)``; ``complete`` is False once any
+    # summarization call fell back to a raw excerpt.
+    def _map(self, text):
+        chunks = self._chunks(text)
+        logger.info(f"🗺️ Summarizing {len(chunks)} chunk(s) of oversized content.")
+        # Each task runs in a copy of the caller's context so token usage is attributed to its request.
+        futures = [
+            self._executor.submit(
+                contextvars.copy_context().run, self._complete, MAP_PROMPT.format(index=i + 1, total=len(chunks)), chunk
+            )
+            for i, chunk in enumerate(chunks)
+        ]
+        results = [future.result() for future in futures]
+        return [summary for summary, _ in results], all(complete for _, complete in results)
+
+    def _reduce(self, summaries, complete=True):
+        merged = "\n\n".join(summaries)
+        if count_tokens(merged) <= self.max_tokens:
+            return merged, complete
+        if len(summaries) > 1 and count_tokens(merged) > 2 * self.max_tokens:
+            # Far too long for one merge call: condense the summaries another round first.
+            partial, mapped = self._map(merged)
+            if not mapped:
+                # Excerpts don't shrink the text the way summaries do; stop instead of recursing forever.
+                return truncate_tokens("\n\n".join(partial), self.max_tokens), False
+            return self._reduce(partial, complete)
+        summary, reduced = self._complete(REDUCE_PROMPT, merged)
+        return summary, complete and reduced
+
+    def _complete(self, instructions, content):
+        try:
+            response = self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": instructions},
+                    {"role": "user", "content": content}
+                ],
+                temperature=0.2,
+                max_tokens=800
+            )
+            record_usage("summarizer", response.usage)
+            return response.choices[0].message.content.strip(), True
+        except Exception as e:
+            # Fall back to a truncated excerpt so the request can still proceed.
+            logger.error(f"❌ Summarization call failed: {repr(e)}")
+            return truncate_tokens(content, self.chunk_tokens), False
+
+    # ===== Cache =====
+    def _cached(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        if self.collection is None:
+            return None
+        try:
+            doc = self.collection.find_one({"_id": key}, {"summary": 1})
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Summary cache lookup failed: {e}")
+            return None
+        if doc:
+            self._remember(key, doc["summary"])
+            return doc["summary"]
+        return None
+
+    def _remember(self, key, summary):
+        with self._lock:
+            self._memory[key] = summary
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, key, summary):
+        self._remember(key, summary)
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_one(
+                {"_id": key},
+                {"$set": {"summary": summary, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Summary cache write failed: {e}")
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+import pymongo
+from pymongo.errors import PyMongoError
+from dotenv import load_dotenv
+from agents.logger import get_logger
+from agents.metrics import MongoCommandMetrics
+
+load_dotenv()
+
+logger = get_logger("db", "logs/db.log")
+
+# Logical collection name -> (env var holding the real name, default).
+COLLECTIONS = {
+    "users": ("USERS_COLLECTION_NAME", None),
+    "chats": ("CHATS_COLLECTION_NAME", None),
+    "pricing_cache": ("PRICING_CACHE_COLLECTION_NAME", "pricing_cache"),
+    "sessions": ("SESSIONS_COLLECTION_NAME", "sessions"),
+    "user_queue": ("USER_QUEUE_COLLECTION_NAME", "user_queue"),
+    "jobs": ("JOBS_COLLECTION_NAME", "chat_jobs"),
+    "documents": ("DOCUMENTS_COLLECTION_NAME", "documents"),
+    "summaries": ("SUMMARIES_COLLECTION_NAME", "content_summaries"),
+    "chat_clears": ("CHAT_CLEARS_COLLECTION_NAME", "chat_clears"),
+}
+
+# Logical collection name -> list of (keys, options). create_index is idempotent.
+INDEXES = {
+    "users": [
+        ("username", {"unique": True}),
+        ("email", {"unique": True}),
+    ],
+    "chats": [
+        ([("username", 1), ("timestamp", -1), ("_id", -1)], {}),
+        ([("intent_source", 1), ("timestamp", -1)], {}),
+    ],
+    "pricing_cache": [
+        ("expires_at", {"expireAfterSeconds": 0}),
+    ],
+    "jobs": [
+        ("created_at", {"expireAfterSeconds": 7 * 86400}),
+        ([("status", 1), ("updated_at", 1)], {}),
+    ],
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide pooled MongoClient shared by the app and all agents."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = pymongo.MongoClient(
+                    os.getenv("MONGO_URI"),
+                    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+                    minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+                    maxIdleTimeMS=int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+                    serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+                    connectTimeoutMS=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+                    socketTimeoutMS=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000")),
+                    retryWrites=True,
+                    retryReads=True,
+                    appname="best-ui",
+                    event_listeners=[MongoCommandMetrics()]
+                )
+    return _client
+
+
+def get_user_db():
+    return get_client()[os.getenv("USER_DB_NAME")]
+
+
+def get_collection(name):
+    env_var, default = COLLECTIONS[name]
+    return get_user_db()[os.getenv(env_var, default)]
+
+
+def get_recommender_collection():
+    db_name = os.getenv("RECOMMENDER_DB_NAME")
+    collection_name = os.getenv("RECOMMENDER_COLLECTION_NAME")
+    if not all([os.getenv("MONGO_URI"), db_name, collection_name]):
+        raise ValueError("MongoDB environment variables not set correctly in .env file.")
+    return get_client()[db_name][collection_name]
+
+
+def ensure_indexes():
+    """Create every declared index. Safe to run on each startup."""
+    created, failed = 0, 0
+    for name, specs in INDEXES.items():
+        collection = get_collection(name)
+        for keys, options in specs:
+            try:
+                collection.create_index(keys, **options)
+                created += 1
+            except PyMongoError as e:
+                # e.g. existing duplicate usernames block a unique index; keep serving.
+                failed += 1
+                logger.error(f"❌ Index {keys} on {name} failed: {e}")
+    logger.info(f"✅ Index bootstrap done: {created} ensured, {failed} failed.")
+    return failed == 0
+
+
+def ping():
+    """Round-trip a ping to the primary. Returns ``(ok, latency_ms, error)``."""
+    start = time.perf_counter()
+    try:
+        get_client().admin.command("ping")
+        return True, round((time.perf_counter() - start) * 1000, 2), None
+    except PyMongoError as e:
+        return False, round((time.perf_counter() - start) * 1000, 2), str(e)
@@ -0,0 +1,131 @@
+import importlib
+import json
+import os
+import threading
+import time
+from agents.logger import get_logger
+from agents.metrics import timed
+
+logger = get_logger("file_readers", "logs/file_readers.log")
+
+# Extension -> reader. Readers import their backend through load_backend on first use,
+# so nothing heavy (pandas, PyPDF2, PIL, pytesseract, speech_recognition, docx) loads at startup.
+READERS = {}
+# Backend module -> milliseconds its first import took in this process.
+IMPORT_TIMINGS = {}
+_backends = {}
+_lock = threading.Lock()
+
+
+def register_reader(*extensions):
+    def decorator(func):
+        for ext in extensions:
+            READERS[ext.lower()] = func
+        return func
+    return decorator
+
+
+def load_backend(name):
+    """Import ``name`` on first use and record how long the import took."""
+    module = _backends.get(name)
+    if module is None:
+        with _lock:
+            module = _backends.get(name)
+            if module is None:
+                start = time.perf_counter()
+                module = importlib.import_module(name)
+                IMPORT_TIMINGS[name] = round((time.perf_counter() - start) * 1000, 1)
+                logger.info(f"📦 Loaded reader backend {name} in {IMPORT_TIMINGS[name]} ms.")
+                _backends[name] = module
+    return module
+
+
+def supported_extensions():
+    return sorted(READERS)
+
+
+@timed("file_read")
+def read_file(path):
+    """Extract text from ``path`` with the reader registered for its extension."""
+    ext = os.path.splitext(path)[-1].lower()
+    reader = READERS.get(ext)
+    if reader is None:
+        logger.warning(f"Unsupported file type: {ext}")
+        return ""
+    try:
+        return reader(path)
+    except Exception as e:
+        logger.error(f"{ext} read error: {e}")
+        return ""
+
+
+# ===== Readers =====
+@register_reader(".txt")
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@register_reader(".json")
+def read_json(path):
+    with open(path, "r") as f:
+        return json.dumps(json.load(f), indent=2)
+
+
+@register_reader(".docx")
+def read_docx(path):
+    docx = load_backend("docx")
+    return "\n".join(para.text for para in docx.Document(path).paragraphs)
+
+
+@register_reader(".pdf")
+def read_pdf(path):
+    pdf_extractor = load_backend("agents.pdf_extractor")
+    return "\n".join(pdf_extractor.iter_pdf_pages(
+        path,
+        max_tokens=int(os.getenv("PDF_TOKEN_BUDGET", "100000")),
+        workers=int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1)))),
+        pages_per_chunk=int(os.getenv("PDF_PAGES_PER_CHUNK", "16"))
+    ))
+
+
+@register_reader(".csv")
+def read_csv(path):
+    profiler = load_backend("agents.tabular_profiler")
+    return profiler.profile_csv(path, sample_rows=int(os.getenv("TABULAR_SAMPLE_ROWS", "5")))
+
+
+@register_reader(".xlsx")
+def read_xlsx(path):
+    profiler = load_backend("agents.tabular_profiler")
+    return profiler.profile_xlsx(path, sample_rows=int(os.getenv("TABULAR_SAMPLE_ROWS", "5")))
+
+
+@register_reader(".png", ".jpg", ".jpeg")
+def read_image(path):
+    image = load_backend("PIL.Image")
+    pytesseract = load_backend("pytesseract")
+    return pytesseract.image_to_string(image.open(path))
+
+
+@register_reader(".wav", ".mp3")
+def read_audio(path):
+    sr = load_backend("speech_recognition")
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(path) as source:
+        return recognizer.recognize_google(recognizer.record(source))
+
+
+if __name__ == "__main__":
+    # Cold import cost of each backend, each measured in a fresh interpreter:
+    #   python -m agents.file_readers
+    import subprocess
+    import sys
+
+    modules = ["agents.chat_agent", "docx", "agents.pdf_extractor", "agents.tabular_profiler",
+               "PIL.Image", "pytesseract", "speech_recognition"]
+    probe = "import importlib, sys, time; t = time.perf_counter(); importlib.import_module(sys.argv[1]); print((time.perf_counter() - t) * 1000)"
+    for name in modules:
+        result = subprocess.run([sys.executable, "-c", probe, name], capture_output=True, text=True)
+        took = f"{float(result.stdout):8.1f} ms" if result.returncode == 0 else "  not installed"
+        print(f"{name:28} {took}")
@@ -0,0 +1,163 @@
+import re
+from agents.logger import get_logger
+from agents.model_catalog import MODEL_NAME_KEYS, model_name
+from agents.prompt_encoding import compact_value
+
+logger = get_logger("follow_up_resolver", "logs/follow_up_resolver.log")
+
+MAX_QUESTION_WORDS = 25
+
+# Question type -> (pattern in the question, words in the catalog field names that answer it, template).
+QUESTION_TYPES = {
+    "price": (
+        re.compile(r"\b(price|pricing|priced|cost|costs|how much|charge|charged|fee|fees|per (image|token|1k|minute|hour|call|request|page))\b"),
+        ("price", "pricing", "cost"),
+        "{field} for {model}: {value}"
+    ),
+    "unit": (
+        re.compile(r"\b(unit|units|billed|billing)\b"),
+        ("unit", "billing"),
+        "{field} for {model}: {value}"
+    ),
+    "region": (
+        re.compile(
+            r"\b(regions?|availability|countr(y|ies)|locations?|(available|offered|hosted) in|deploy\w* (in|to)"
+            r"|where\b.*\b(available|offered|hosted|deploy\w*))\b"
+        ),
+        ("region", "availability", "location", "country"),
+        "{model} is available in: {value} ({field})"
+    ),
+    "provider": (
+        re.compile(r"\b(provider|vendor|company|cloud|who (makes|made|built|provides|offers|owns))\b"),
+        ("provider", "cloud", "vendor", "company", "developer"),
+        "{field} for {model}: {value}"
+    ),
+    "speed": (
+        re.compile(r"\b(speed|fast|faster|slow|latency|quick|quickly|response time|throughput)\b"),
+        ("speed", "latency", "throughput"),
+        "{field} for {model}: {value}"
+    ),
+    "accuracy": (
+        re.compile(r"\b(accuracy|accurate|precise|precision|quality|benchmark\w*|score)\b"),
+        ("accuracy", "quality", "benchmark", "score"),
+        "{field} for {model}: {value}"
+    ),
+}
+
+# Questions that need reasoning rather than a field lookup go to the LLM.
+OPEN_ENDED_RE = re.compile(
+    r"\b(why|compare|comparison|versus|vs|better|worse|instead|alternatives?|explain|recommend|should|"
+    r"difference|cheaper|pros|cons|what if|how (do|can|to|would|does))\b"
+)
+
+
+# The place a region question names: "available in India", "deploy to West Europe?".
+PLACE_RE = re.compile(r"\b(?:in|to)\s+(?:the\s+)?([a-z][a-z .\-]*)")
+PLACE_END_RE = re.compile(r"\s+(?:for|with|as|at|on|by|if|when|under|using|region|regions|zone|area)\b.*|[\s.\-]+$")
+NOT_PLACES = {"which", "what", "any", "all", "how", "many", "other", "more", "multiple", "several", "production"}
+
+# "cost per image": the unit a price question asks about.
+PER_UNIT_RE = re.compile(r"\bper\s+([a-z0-9]+)")
+
+# Words that carry no qualifier. Any other word left once the field keyword, the model's name, the
+# field's own name and the asked place are removed ("noisy audio", "on-prem", "long files") means the
+# question asks more than the field says, so it goes to the LLM.
+STOPWORDS = {
+    "a", "an", "the", "it", "its", "it's", "this", "that", "model", "is", "are", "was", "be", "does", "do",
+    "what", "whats", "s", "which", "who", "how", "much", "many", "tell", "me", "us", "about", "please",
+    "can", "could", "you", "i", "we", "know", "of", "for", "in", "to", "on", "at", "and", "or", "there",
+    "any", "per", "by", "with", "give", "show", "share", "let", "say", "current", "currently", "again",
+    "exact", "exactly", "approx", "approximately", "roughly", "hi", "ok", "okay", "thanks", "so", "then",
+}
+
+
+def _key_words(key):
+    # "CostPer1K", "cost_per_1k" and "Cost per 1K" all give {"cost", "per", "k"}.
+    spaced = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(key))
+    return set(re.findall(r"[a-z]+", spaced.lower()))
+
+
+def _fields_for(model_info, words):
+    fields = []
+    for key, value in model_info.items():
+        if key in MODEL_NAME_KEYS or value in (None, "", [], {}):
+            continue
+        key_words = _key_words(key)
+        if any(word in key_words or word + "s" in key_words for word in words):
+            fields.append(key)
+    return fields
+
+
+def _named_place(text):
+    match = PLACE_RE.search(text)
+    if not match:
+        return None
+    place = PLACE_END_RE.sub("", match.group(1)).strip()
+    if not place or place.split()[0] in NOT_PLACES:
+        return None
+    return place
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def _unit_listed(unit, values):
+    stem = unit[:-1] if unit.endswith("s") and len(unit) > 3 else unit
+    return any(re.search(rf"\b{re.escape(stem)}", value) for value in values)
+
+
+def resolve_follow_up(question, model_info):
+    """Answer a structured follow-up straight from ``model_info`` fields.
+
+    Returns ``None`` when the question is open-ended, matches no known
+    question type, the model record lacks the fields to answer it, asks
+    about a region or price unit those fields don't list, or carries
+    qualifiers beyond the lookup ("good quality for noisy audio"); the
+    caller should then ask the LLM.
+    """
+    text = (question or "").lower()
+    if not text.strip() or not model_info or len(text.split()) > MAX_QUESTION_WORDS or OPEN_ENDED_RE.search(text):
+        return None
+
+    asked = [name for name, (pattern, _, _) in QUESTION_TYPES.items() if pattern.search(text)]
+    if not asked:
+        return None
+
+    name = model_name(model_info) or "the selected model"
+    rest = text
+    allowed = set(_words(name.lower()))
+    lines, used = [], set()
+    for kind in asked:
+        pattern, words, template = QUESTION_TYPES[kind]
+        fields = [key for key in _fields_for(model_info, words) if key not in used]
+        if not fields:
+            logger.info(f"↪️ No catalog field answers '{kind}' for {name}; deferring to the LLM.")
+            return None
+        values = [str(model_info[key]).lower() for key in fields]
+        if kind == "region":
+            place = _named_place(text)
+            if place and not any(place in value for value in values):
+                logger.info(f"↪️ '{place}' is not listed for {name}; deferring to the LLM.")
+                return None
+            if place:
+                allowed.update(_words(place))
+        if kind == "price":
+            for unit in PER_UNIT_RE.findall(text):
+                if not _unit_listed(unit, values):
+                    logger.info(f"↪️ {name} is not priced per '{unit}'; deferring to the LLM.")
+                    return None
+                allowed.add(unit)
+        rest = pattern.sub(" ", rest)
+        for key in fields:
+            allowed.update(_key_words(key))
+            used.add(key)
+            lines.append(template.format(field=key, model=name, value=compact_value(model_info[key], max_chars=0)))
+
+    qualifiers = [word for word in _words(rest) if word not in STOPWORDS and word not in allowed]
+    if qualifiers:
+        logger.info(f"↪️ Follow-up asks more than the fields say ({' '.join(qualifiers)}); deferring to the LLM.")
+        return None
+
+    logger.info(f"⚡ Answered follow-up ({', '.join(asked)}) from catalog fields.")
+    return "\n".join(lines)
@@ -0,0 +1,273 @@
+import os
+import hashlib
+import multiprocessing
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DocumentTooLarge, PyMongoError
+from agents.logger import get_logger
+from agents.file_readers import read_file
+
+logger = get_logger("ingestion", "logs/ingestion.log")
+
+CHUNK_SIZE = 1024 * 1024
+# Stay well under MongoDB's 16MB document limit (measured encoded: non-ASCII text takes 2-4 bytes a char).
+MAX_STORED_TEXT_BYTES = 8 * 1024 * 1024
+# Never fork the web worker itself: a lock held by one of its threads at fork time
+# (Mongo pool, metrics registry, log queue) would stay locked forever in the child.
+MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+if MP_CONTEXT.get_start_method() == "forkserver":
+    # The default preload is __main__, which would run main_flask's startup inside the fork server.
+    MP_CONTEXT.set_forkserver_preload(["agents.file_readers"])
+
+
+def _init_extraction_worker():
+    # The extraction pool already runs one document per process; nesting a PDF pool inside it would
+    # multiply processes (gunicorn workers x extraction workers x PDF workers) for little gain.
+    os.environ["PDF_EXTRACTION_WORKERS"] = "1"
+
+
+class ExtractionPending(Exception):
+    """The document's text is still being extracted."""
+
+
+def cap_text(text):
+    """``text`` cut to at most ``MAX_STORED_TEXT_BYTES`` of UTF-8, on a character boundary."""
+    if len(text) * 4 <= MAX_STORED_TEXT_BYTES:
+        return text  # fits whatever the characters are
+    encoded = text.encode("utf-8")
+    if len(encoded) <= MAX_STORED_TEXT_BYTES:
+        return text
+    return encoded[:MAX_STORED_TEXT_BYTES].decode("utf-8", errors="ignore")
+
+
+def extract_text(path):
+    """Extract text from an uploaded file; runs inside the extraction process pool."""
+    return read_file(path)
+
+
+class DocumentStore:
+    """Content-addressed uploads with background text extraction.
+
+    Files are stored as ``<sha256><ext>`` so identical uploads share one copy
+    and one extraction. Extraction runs in a process pool at upload time; the
+    text is kept in Mongo (``_id`` is the content hash) with a small
+    in-memory LRU in front, and ``/chat`` refers to it by document id.
+
+    A worker extracts only after claiming the document in Mongo, so the
+    same file uploaded to several workers is parsed once. A claim older
+    than ``claim_seconds`` is treated as abandoned (the worker died) and
+    can be taken over, including by a worker waiting in ``get_text``.
+    """
+
+    def __init__(self, collection, upload_dir="uploads", max_workers=2, memory_entries=32, claim_seconds=600):
+        self.collection = collection
+        self.upload_dir = upload_dir
+        self.max_workers = max_workers
+        self.memory_entries = memory_entries
+        self.claim_seconds = claim_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._texts = OrderedDict()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=MP_CONTEXT, initializer=_init_extraction_worker
+                )
+            return self._executor
+
+    def ingest(self, file_storage, filename):
+        """Store an upload and start extraction. Returns ``(document_id, path, duplicate)``."""
+        os.makedirs(self.upload_dir, exist_ok=True)
+        ext = os.path.splitext(filename)[-1].lower()
+
+        # Hash while streaming to a temp file so large uploads are never held in memory.
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.upload_dir, delete=False) as tmp:
+            for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                tmp.write(chunk)
+        document_id = digest.hexdigest()
+        path = os.path.join(self.upload_dir, f"{document_id}{ext}")
+
+        duplicate = os.path.exists(path)
+        if duplicate:
+            os.remove(tmp.name)
+        else:
+            os.replace(tmp.name, path)
+
+        doc = self.collection.find_one_and_update(
+            {"_id": document_id},
+            {"$setOnInsert": {
+                "filename": filename,
+                "path": path,
+                "status": "pending",
+                "created_at": datetime.utcnow()
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if doc.get("status") == "ready":
+            logger.info(f"♻️ {filename} already ingested as {document_id}. Skipping extraction.")
+        elif self._claim(document_id):
+            self._schedule(document_id, doc.get("path", path))
+        else:
+            logger.info(f"⏳ {document_id} is already being extracted by another worker.")
+        return document_id, path, duplicate
+
+    def _claim(self, document_id):
+        """Atomically take over extraction of a document nobody is (still) extracting."""
+        now = datetime.utcnow()
+        with self._lock:
+            if document_id in self._futures:
+                return False  # this process already has it running
+        try:
+            claimed = self.collection.find_one_and_update(
+                {
+                    "_id": document_id,
+                    "$or": [
+                        {"status": "failed"},
+                        {"status": "pending", "claimed_at": {"$exists": False}},
+                        {"status": "pending", "claimed_at": {"$lt": now - timedelta(seconds=self.claim_seconds)}},
+                    ],
+                },
+                {"$set": {"status": "pending", "claimed_at": now}}
+            )
+        except PyMongoError as e:
+            logger.error(f"❌ Failed to claim extraction of {document_id}: {e}")
+            return False
+        return claimed is not None
+
+    def _schedule(self, document_id, path):
+        """Submit a claimed document for extraction; returns its future, or None if it couldn't be submitted."""
+        with self._lock:
+            if document_id in self._futures:
+                return self._futures[document_id]
+        try:
+            future = self._submit(path)
+        except Exception as e:
+            logger.error(f"❌ Could not schedule extraction for {document_id}: {repr(e)}")
+            self._release_claim(document_id)
+            return None
+        with self._lock:
+            self._futures[document_id] = future
+        future.add_done_callback(lambda f: self._on_extracted(document_id, f))
+        logger.info(f"📥 Extraction scheduled for {document_id} ({path}).")
+        return future
+
+    def _submit(self, path):
+        executor = self.executor
+        try:
+            return executor.submit(extract_text, path)
+        except BrokenProcessPool:
+            # A child died (OOM, crash in a native parser); the pool refuses all further work.
+            logger.warning("⚠️ Extraction pool is broken. Recreating it.")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return self.executor.submit(extract_text, path)
+
+    def _release_claim(self, document_id):
+        # Mark it failed so the next upload (or a waiting get_text) doesn't sit out claim_seconds.
+        try:
+            self.collection.update_one(
+                {"_id": document_id, "status": "pending"},
+                {"$set": {"status": "failed"}, "$unset": {"claimed_at": ""}}
+            )
+        except PyMongoError as e:
+            logger.error(f"❌ Failed to release extraction claim on {document_id}: {e}")
+
+    def _on_extracted(self, document_id, future):
+        try:
+            text = future.result()
+            status = "ready"
+        except Exception as e:
+            logger.error(f"❌ Extraction failed for {document_id}: {repr(e)}")
+            text, status = "", "failed"
+
+        capped = cap_text(text)
+        if len(capped) < len(text):
+            logger.warning(f"⚠️ Extracted text for {document_id} truncated to {MAX_STORED_TEXT_BYTES} bytes.")
+            text = capped
+
+        self._remember(document_id, text)
+        try:
+            self.collection.update_one(
+                {"_id": document_id},
+                {"$set": {"status": status, "text": text, "extracted_at": datetime.utcnow()}}
+            )
+        except DocumentTooLarge as e:
+            # Not a PyMongoError; without this the document would stay "pending" forever.
+            logger.error(f"❌ Extracted text for {document_id} does not fit in a document: {e}")
+            self._release_claim(document_id)
+        except PyMongoError as e:
+            logger.error(f"❌ Failed to store extracted text for {document_id}: {e}")
+        finally:
+            with self._lock:
+                self._futures.pop(document_id, None)
+        logger.info(f"✅ Extracted {len(text)} chars for {document_id}.")
+
+    def _remember(self, document_id, text):
+        with self._lock:
+            self._texts[document_id] = text
+            self._texts.move_to_end(document_id)
+            while len(self._texts) > self.memory_entries:
+                self._texts.popitem(last=False)
+
+    def get_text(self, document_id, timeout=60):
+        """Return the extracted text, waiting up to ``timeout`` seconds if still pending.
+
+        Returns ``None`` for an unknown document and ``""`` when extraction
+        failed; raises ``ExtractionPending`` if it is still running at the
+        deadline.
+        """
+        with self._lock:
+            if document_id in self._texts:
+                self._texts.move_to_end(document_id)
+                return self._texts[document_id]
+            future = self._futures.get(document_id)
+
+        if future is not None:
+            return self._wait_for(document_id, future, timeout)
+
+        # Extracted by another worker (or before a restart): wait on the shared record.
+        deadline = time.monotonic() + timeout
+        while True:
+            doc = self.collection.find_one({"_id": document_id}, {"status": 1, "text": 1, "path": 1})
+            if not doc:
+                return None
+            if doc["status"] in ("ready", "failed"):
+                text = doc.get("text", "")
+                self._remember(document_id, text)
+                return text
+            if doc.get("path") and self._claim(document_id):
+                # The claiming worker went away; extract it here instead.
+                logger.warning(f"⚠️ Extraction claim on {document_id} went stale. Taking it over.")
+                future = self._schedule(document_id, doc["path"])
+                if future is None:
+                    return ""
+                return self._wait_for(document_id, future, max(deadline - time.monotonic(), 0))
+            if time.monotonic() >= deadline:
+                raise ExtractionPending(document_id)
+            time.sleep(0.5)
+
+    def _wait_for(self, document_id, future, timeout):
+        try:
+            return cap_text(future.result(timeout=timeout))
+        except FutureTimeout:
+            logger.warning(f"⚠️ Extraction for {document_id} still running after {timeout}s.")
+            raise ExtractionPending(document_id)
+        except Exception:
+            return ""
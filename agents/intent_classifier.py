@@ -0,0 +1,197 @@
+import math
+import random
+import re
+import threading
+from collections import Counter
+from pymongo.errors import PyMongoError
+from agents.candidate_retriever import tokenize
+from agents.logger import get_logger
+
+logger = get_logger("intent_classifier", "logs/intent_classifier.log")
+
+PROCEED = "proceed"
+HOLD = "hold"
+
+# main_flask appends extracted file text to the message after this marker.
+FILE_CONTENT_MARKER = "\n\n--- File Content Extracted ---"
+
+# Whole-message small talk: safe to answer without the gatekeeper.
+SMALL_TALK_RE = re.compile(
+    r"^\s*(hi+|hey+|hello+|hiya|yo|good (morning|afternoon|evening|night)|thanks?( you)?( so much)?|thank u|thx|ty|"
+    r"ok(ay)?|cool|great|nice|bye|goodbye|see you|how are you( doing)?|what'?s up|who are you|test(ing)?)"
+    r"[\s!.?,:)]*(there|again|bot|buddy)?[\s!.?,:)]*$",
+    re.IGNORECASE
+)
+# Explicit task requests only: an imperative task verb opening the message, or asking for a model
+# *to do* something. A bare keyword ("a joke about translation", "which model are you?") is not enough.
+TASK_RE = re.compile(
+    r"^\s*(please |can you |could you |help me |(i|we) (need|want) to )?"
+    r"(summari[sz]e|transcribe|translate|generate|classify|extract) \w+"
+    r"|\b(recommend|suggest)\w* (me |us )?(an? |the |some )?(best )?(ai |ml )?models? (to|for|that)\b"
+    r"|\b(need|want|looking for) (an? |some )?([\w-]+ ){0,4}?(ai |ml )?(model|tool)s? (to|for|that)\b"
+    r"|\b(which|what) (ai |ml )?model (should|would|can|could) (i|we)\b",
+    re.IGNORECASE
+)
+
+SEED_EXAMPLES = [
+    ("hi", HOLD), ("hello there", HOLD), ("thanks a lot", HOLD), ("tell me a joke", HOLD),
+    ("what is the weather today", HOLD), ("who won the match yesterday", HOLD),
+    ("summarize long legal contracts", PROCEED), ("transcribe customer support calls", PROCEED),
+    ("generate product images for my store", PROCEED), ("translate documents from english to hindi", PROCEED),
+    ("i need a model to extract text from scanned invoices", PROCEED), ("build a chatbot for our website", PROCEED),
+]
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes over word tokens with Laplace smoothing."""
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.labels = []
+        self._log_prior = {}
+        self._counts = {}
+        self._totals = {}
+        self._vocab = set()
+
+    def fit(self, examples):
+        docs = Counter()
+        self._counts = {}
+        for text, label in examples:
+            docs[label] += 1
+            self._counts.setdefault(label, Counter()).update(tokenize(text))
+        self.labels = sorted(docs)
+        self._vocab = set().union(*self._counts.values()) if self._counts else set()
+        self._totals = {label: sum(counts.values()) for label, counts in self._counts.items()}
+        total_docs = sum(docs.values())
+        self._log_prior = {label: math.log(docs[label] / total_docs) for label in self.labels}
+        return self
+
+    def predict(self, text):
+        """Return ``(label, probability)`` for the most likely label."""
+        tokens = [t for t in tokenize(text) if t in self._vocab]
+        if not self.labels or not tokens:
+            return None, 0.0
+        vocab_size = len(self._vocab)
+        scores = {}
+        for label in self.labels:
+            counts, denom = self._counts[label], self._totals[label] + self.alpha * vocab_size
+            scores[label] = self._log_prior[label] + sum(
+                math.log((counts[t] + self.alpha) / denom) for t in tokens
+            )
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / norm
+
+
+def typed_message(text):
+    """The part of a chat message the user typed, without any appended file content."""
+    return (text or "").split(FILE_CONTENT_MARKER, 1)[0].strip()
+
+
+def rule_label(text):
+    """PROCEED/HOLD from the regex rules, or ``None`` when they don't apply."""
+    if SMALL_TALK_RE.match(text or ""):
+        return HOLD
+    if TASK_RE.search(text or ""):
+        return PROCEED
+    return None
+
+
+class IntentClassifier:
+    """Decides PROCEED/HOLD locally when confident, so clear cases skip the gatekeeper call.
+
+    Two local tiers: regex rules for small talk and explicit task requests,
+    then a naive Bayes model trained on past gatekeeper decisions. Both are
+    scored against those LLM-labelled decisions by ``train`` (the model on a
+    held-out slice) and each answers only once there are ``min_examples``
+    decisions and it reached ``min_accuracy`` on the ones it answers.
+    Otherwise ``classify`` returns ``None`` and the caller asks the LLM.
+
+    ``audit_rate`` of the messages a tier could answer still go to the LLM,
+    so the history keeps labels for exactly the cases the tiers take over.
+    """
+
+    def __init__(self, confidence=0.9, min_examples=50, min_accuracy=0.9, audit_rate=0.05):
+        self.confidence = confidence
+        self.min_examples = min_examples
+        self.min_accuracy = min_accuracy
+        self.audit_rate = audit_rate
+        self._lock = threading.Lock()
+        self._rules_enabled = False
+        self._model = None
+        self.metrics = {}
+
+    def classify(self, text):
+        """Return ``(label, source)`` for the typed message, or ``None`` when unsure."""
+        decision = None
+        label = rule_label(text) if self._rules_enabled else None
+        if label:
+            decision = label, "rules"
+        else:
+            model = self._model
+            if model is not None:
+                label, probability = model.predict(text)
+                if label and probability >= self.confidence:
+                    decision = label, "model"
+        if decision and random.random() < self.audit_rate:
+            return None
+        return decision
+
+    def train(self, examples):
+        """Score both tiers on ``(text, label)`` pairs; enable each that is accurate enough."""
+        examples = [(text, label) for text, label in examples if text and label in (PROCEED, HOLD)]
+        enough = len(examples) >= self.min_examples
+
+        rules = self.evaluate(rule_label, examples)
+        rules["scored"] = len(examples)
+        rules["enabled"] = enough and rules["accuracy"] >= self.min_accuracy
+
+        holdout = examples[::5]
+        training = [example for i, example in enumerate(examples) if i % 5]
+        model = self.evaluate(self._confident(NaiveBayes().fit(training + SEED_EXAMPLES)), holdout)
+        model["scored"] = len(holdout)
+        model["enabled"] = enough and model["accuracy"] >= self.min_accuracy
+
+        with self._lock:
+            self._rules_enabled = rules["enabled"]
+            self._model = NaiveBayes().fit(examples + SEED_EXAMPLES) if model["enabled"] else None
+            self.metrics = {"examples": len(examples), "rules": rules, "model": model}
+        for tier, metrics in (("rules", rules), ("model", model)):
+            logger.info(
+                f"🧠 Intent {tier} scored on {metrics['scored']} decision(s): accuracy {metrics['accuracy']:.1%}, "
+                f"coverage {metrics['coverage']:.1%} - {'enabled' if metrics['enabled'] else 'disabled'}."
+            )
+        return self.metrics
+
+    def _confident(self, model):
+        def predict(text):
+            label, probability = model.predict(text)
+            return label if probability >= self.confidence else None
+        return predict
+
+    @staticmethod
+    def evaluate(predict, examples):
+        """Accuracy over the examples ``predict`` answers (non-``None``), and the share it answers."""
+        answered = correct = 0
+        for text, label in examples:
+            predicted = predict(text)
+            if predicted:
+                answered += 1
+                correct += predicted == label
+        return {
+            "accuracy": correct / answered if answered else 0.0,
+            "coverage": answered / len(examples) if examples else 0.0,
+        }
+
+    def train_from_history(self, collection, limit=5000):
+        """Train on gatekeeper decisions stored with past chat turns."""
+        try:
+            docs = collection.find(
+                {"intent": {"$in": [PROCEED, HOLD]}, "intent_source": "llm"},
+                {"message": 1, "intent": 1}
+            ).sort("timestamp", -1).limit(limit)
+            examples = [(typed_message(doc.get("message", "")), doc["intent"]) for doc in docs]
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Could not load intent training data: {e}")
+            return self.metrics
+        return self.train(examples)
@@ -0,0 +1,277 @@
+import contextvars
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from agents.logger import get_logger
+from agents.user_queue import QUEUE_TIMEOUT_MESSAGE
+
+logger = get_logger("job_queue", "logs/job_queue.log")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobManager:
+    """Runs chat pipelines as background jobs on a bounded thread pool.
+
+    Every job lives in a Mongo document (status, progress events, result),
+    so any worker can answer status polls. Each job records the ``owner``
+    process that holds it, and a heartbeat thread refreshes ``updated_at``
+    of the jobs this process holds (waiting or running) every
+    ``heartbeat_seconds``. ``resume_pending`` takes over only jobs whose
+    owner stopped heartbeating: queued ones after ``orphan_seconds``, running
+    ones after ``stale_seconds``. A job that is merely slow or still waiting
+    in a live worker's queue is never picked up twice.
+
+    A job takes a ticket in ``user_queue`` when it is submitted but only gets
+    a pool thread once that ticket is at the front; until then an admission
+    thread polls it every ``admit_poll_seconds`` and records its position.
+    A job still waiting after ``queue_timeout`` seconds finishes with a 503.
+    The heartbeat and admission threads run once ``start`` is called.
+    """
+
+    def __init__(self, collection, runner, user_queue, max_workers=4, max_pending=100, stale_seconds=900,
+                 heartbeat_seconds=30, queue_timeout=300, admit_poll_seconds=0.5, orphan_seconds=None):
+        self.collection = collection
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.runner = runner
+        self.user_queue = user_queue
+        self.max_pending = max_pending
+        self.stale_seconds = stale_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.orphan_seconds = orphan_seconds or heartbeat_seconds * 3
+        self.queue_timeout = queue_timeout
+        self.admit_poll_seconds = admit_poll_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-job")
+        self._pending = 0
+        self._running = set()
+        self._waiting = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._heartbeat, name="chat-job-heartbeat", daemon=True).start()
+        threading.Thread(target=self._admit_loop, name="chat-job-admission", daemon=True).start()
+
+    def submit(self, username, message, file_path=None, document_id=None):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+
+        now = datetime.utcnow()
+        job_id = uuid.uuid4().hex
+        try:
+            self.collection.insert_one({
+                "_id": job_id,
+                "username": username,
+                "message": message,
+                "file_path": file_path,
+                "document_id": document_id,
+                "status": "queued",
+                "owner": self.owner,
+                "events": [],
+                "result": None,
+                "created_at": now,
+                "updated_at": now
+            })
+        except PyMongoError:
+            with self._lock:
+                self._pending -= 1
+            raise
+        self._enqueue(job_id, username)
+        logger.info(f"📥 Job {job_id} queued for {username}.")
+        return job_id
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id})
+
+    def _enqueue(self, job_id, username):
+        try:
+            ticket = self.user_queue.enter(username)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        with self._lock:
+            # The job inherits the submitting request's context (trace id).
+            self._waiting[job_id] = {
+                "ticket": ticket,
+                "deadline": time.monotonic() + self.queue_timeout,
+                "position": None,
+                "context": contextvars.copy_context()
+            }
+        self._wake.set()
+
+    def _admit_loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.admit_poll_seconds)
+            self._wake.clear()
+            with self._lock:
+                waiting = list(self._waiting.items())
+            for job_id, entry in waiting:
+                try:
+                    self._admit(job_id, entry)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not check queue position of job {job_id}: {e}")
+
+    def _admit(self, job_id, entry):
+        ticket = entry["ticket"]
+        position = self.user_queue.poll(ticket)
+        if position == 0:
+            with self._lock:
+                del self._waiting[job_id]
+            self._executor.submit(entry["context"].run, self._run, job_id, ticket)
+            return
+
+        if time.monotonic() >= entry["deadline"]:
+            with self._lock:
+                del self._waiting[job_id]
+                self._pending -= 1
+            self.user_queue.release(ticket)
+            logger.warning(f"⏳ Job {job_id} timed out in the user queue.")
+            self.collection.update_one(
+                {"_id": job_id, "status": "queued", "owner": self.owner},
+                {"$set": {
+                    "status": "done",
+                    "result": {"event": "result", "status": 503, "body": {"response": QUEUE_TIMEOUT_MESSAGE}},
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+            return
+
+        if position != entry["position"]:
+            entry["position"] = position
+            self.collection.update_one(
+                {"_id": job_id},
+                {"$push": {"events": {"event": "queued", "position": position}},
+                 "$set": {"updated_at": datetime.utcnow()}}
+            )
+
+    def _run(self, job_id, ticket):
+        try:
+            # Claim the job; another worker may already have taken it after a restart.
+            job = self.collection.find_one_and_update(
+                {"_id": job_id, "status": "queued", "owner": self.owner},
+                {"$set": {"status": "running", "updated_at": datetime.utcnow()}},
+                return_document=ReturnDocument.AFTER
+            )
+            if not job:
+                return
+
+            logger.info(f"🏃 Job {job_id} started.")
+            with self._lock:
+                self._running.add(job_id)
+            # The user queue heartbeats the ticket's lease until it is released below.
+            for event in self.runner(job):
+                update = {"$set": {"updated_at": datetime.utcnow()}}
+                if event["event"] == "result":
+                    update["$set"].update({"status": "done", "result": event})
+                else:
+                    update["$push"] = {"events": event}
+                self.collection.update_one({"_id": job_id}, update)
+            logger.info(f"✅ Job {job_id} finished.")
+
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {repr(e)}")
+            try:
+                self.collection.update_one(
+                    {"_id": job_id},
+                    {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()}}
+                )
+            except PyMongoError:
+                pass
+        finally:
+            self.user_queue.release(ticket)
+            with self._lock:
+                self._pending -= 1
+                self._running.discard(job_id)
+            self._wake.set()  # the user's next job may be admitted now
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.heartbeat_seconds):
+            with self._lock:
+                held = list(self._running) + list(self._waiting)
+            if held:
+                try:
+                    self.collection.update_many(
+                        {"_id": {"$in": held}, "owner": self.owner, "status": {"$in": ["queued", "running"]}},
+                        {"$set": {"updated_at": datetime.utcnow()}}
+                    )
+                except PyMongoError as e:
+                    logger.warning(f"⚠️ Job heartbeat failed: {e}")
+            # Pick up jobs of workers that died since startup.
+            self.resume_pending()
+
+    def _orphaned(self, now):
+        """Filter for queued jobs no live worker holds: ownerless, or their owner stopped heartbeating."""
+        return {
+            "status": "queued",
+            "$or": [
+                {"owner": None},
+                {"owner": {"$ne": self.owner}, "updated_at": {"$lt": now - timedelta(seconds=self.orphan_seconds)}},
+            ],
+        }
+
+    def resume_pending(self):
+        """Take over jobs whose worker died and schedule them here."""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.stale_seconds)
+        try:
+            self.collection.update_many(
+                {"status": "running", "updated_at": {"$lt": stale_before}},
+                {"$set": {"status": "queued", "owner": None, "events": [], "updated_at": now}}
+            )
+            jobs = list(self.collection.find(self._orphaned(now), {"_id": 1}).sort("created_at", 1))
+        except PyMongoError as e:
+            logger.error(f"❌ Could not resume pending jobs: {e}")
+            return 0
+
+        resumed = 0
+        for job in jobs:
+            try:
+                # Claim it; another worker resuming at the same time may win.
+                claimed = self.collection.find_one_and_update(
+                    {"_id": job["_id"], **self._orphaned(now)},
+                    {"$set": {"owner": self.owner, "updated_at": datetime.utcnow()}},
+                    projection={"username": 1}
+                )
+            except PyMongoError as e:
+                logger.error(f"❌ Could not claim job {job['_id']}: {e}")
+                continue
+            if not claimed:
+                continue
+            with self._lock:
+                if job["_id"] in self._waiting:
+                    continue
+                self._pending += 1
+            try:
+                self._enqueue(job["_id"], claimed["username"])
+            except Exception as e:
+                logger.error(f"❌ Could not resume job {job['_id']}: {e}")
+                self._disown(job["_id"])
+                continue
+            resumed += 1
+        if resumed:
+            logger.info(f"🔁 Resumed {resumed} pending job(s).")
+        return resumed
+
+    def _disown(self, job_id):
+        # Hand the job back so any worker (this one included) can claim it on its next resume.
+        try:
+            self.collection.update_one({"_id": job_id, "owner": self.owner, "status": "queued"}, {"$set": {"owner": None}})
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Could not release job {job_id}: {e}")
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self._wake.set()
+        self._executor.shutdown(wait=wait)
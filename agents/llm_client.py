@@ -0,0 +1,330 @@
+import email.utils
+import functools
+import os
+import random
+import threading
+import time
+import openai
+from dotenv import load_dotenv
+from agents.logger import get_logger
+from agents.metrics import registry
+
+load_dotenv()
+
+logger = get_logger("llm_client", "logs/llm_client.log")
+
+# 408/409 and every 5xx are transient on Azure; 429 means a quota ceiling.
+RETRYABLE_STATUS = {408, 409, 429}
+# Operations safe to repeat after an ambiguous failure. Anything else (e.g.
+# beta.threads.create_and_run) may already have run server-side, so it is only
+# retried on a 429 or a connection error raised before the request went out.
+IDEMPOTENT_OPERATIONS = {"chat.completions.create"}
+IDEMPOTENT_METHODS = {"retrieve", "list", "cancel"}
+# httpx errors (the SDK error's __cause__) that mean nothing was sent.
+NOT_SENT_ERRORS = {"ConnectError", "ConnectTimeout", "PoolTimeout"}
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+# An attempt with less time left than this is not sent at all.
+MIN_ATTEMPT_SECONDS = 1.0
+
+
+class LLMUnavailable(Exception):
+    pass
+
+
+class TokenBucket:
+    """Request-rate limit shared by every thread; ``rate`` tokens per second, ``burst`` at most."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive outage errors, then lets one probe
+    through every ``reset_seconds`` until a call gets an answer again."""
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            # One probe per reset period; a probe that never reports back doesn't wedge the breaker.
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._opened_at = time.monotonic()
+                self._set_state(HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != CLOSED:
+                logger.info("✅ Azure OpenAI reachable again. Circuit closed.")
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                logger.error(f"🔌 Circuit opened after {self._failures} consecutive Azure OpenAI failures.")
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        registry.set("llm_circuit_state", (), state)
+
+
+class _Resource:
+    """Mirrors the SDK's resource tree (``chat.completions``, ``beta.threads.runs``...),
+    routing every method call through ``ResilientClient.call``."""
+
+    def __init__(self, owner, target, path):
+        self._owner = owner
+        self._target = target
+        self._path = path
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        path = f"{self._path}.{name}"
+        if callable(attr):
+            return functools.partial(self._owner.call, path, attr)
+        return _Resource(self._owner, attr, path)
+
+
+class _SlotStream:
+    """Holds the concurrency slot of a streamed completion until the stream is consumed or closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is not None:
+            try:
+                if hasattr(self._stream, "close"):
+                    self._stream.close()
+            finally:
+                release()
+
+    def __del__(self):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class ResilientClient:
+    """Wraps an ``AzureOpenAI`` client shared by every agent.
+
+    Each call waits for one of ``max_concurrency`` slots (and a rate token
+    when ``requests_per_second`` is set), then runs with an attempt timeout
+    capped by its overall deadline. Timeouts, connection errors, 408/409/429
+    and 5xx responses are retried with jittered exponential backoff; for
+    operations that aren't idempotent only 429s and connection errors raised
+    before the request was sent are. A
+    Retry-After header sets the delay instead and pauses every caller, not
+    just the one that got the 429. Outage errors (everything retryable
+    except 429) feed a circuit breaker; while it is open, calls raise
+    ``LLMUnavailable`` without reaching Azure.
+
+    Agents use it exactly like the SDK client. A ``timeout`` keyword on a call
+    is taken as that call's overall deadline in seconds. A call whose
+    deadline leaves less than ``MIN_ATTEMPT_SECONDS`` for an attempt raises
+    ``LLMUnavailable`` instead of being sent.
+    """
+
+    def __init__(self, client, max_concurrency=16, requests_per_second=0, max_retries=4, backoff_base=0.5,
+                 backoff_max=20, attempt_timeout=90, deadline_seconds=150, breaker=None):
+        self.client = client
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.attempt_timeout = attempt_timeout
+        self.deadline_seconds = deadline_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(requests_per_second, max_concurrency) if requests_per_second else None
+        self._paused_until = 0.0
+
+    def __getattr__(self, name):
+        return _Resource(self, getattr(self.client, name), name)
+
+    def call(self, operation, func, *args, **kwargs):
+        deadline = time.monotonic() + float(kwargs.pop("timeout", None) or self.deadline_seconds)
+        attempt = 0
+        while True:
+            self._acquire(operation, deadline)
+            remaining = deadline - time.monotonic()
+            if remaining < MIN_ATTEMPT_SECONDS:
+                self._slots.release()
+                self._reject(operation, "deadline", "deadline reached while waiting to send")
+            try:
+                result = func(*args, timeout=min(self.attempt_timeout, remaining), **kwargs)
+            except Exception as e:
+                self._slots.release()
+                reason, retry_after = self._classify(e)
+                if reason is None or reason == "rate_limited":
+                    self.breaker.record_success()  # Azure answered; it is not down
+                elif reason == "timeout" and remaining < self.attempt_timeout:
+                    pass  # cut short by the caller's deadline, not evidence of an outage
+                else:
+                    self.breaker.record_failure()
+                if reason is None or not self._safe_to_retry(operation, reason, e):
+                    raise
+                if retry_after is not None:
+                    delay = retry_after + random.uniform(0, self.backoff_base)
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                else:
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                if attempt > self.max_retries or time.monotonic() + delay >= deadline or self.breaker.state == OPEN:
+                    raise
+                registry.inc("llm_retries_total", (operation, reason))
+                logger.warning(f"🔁 {operation} failed ({reason}: {e!r}). Retry {attempt}/{self.max_retries} in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            if kwargs.get("stream"):
+                return _SlotStream(result, self._slots.release)
+            self._slots.release()
+            return result
+
+    def _acquire(self, operation, deadline):
+        if not self.breaker.allow():
+            self._reject(operation, "circuit_open", "Azure OpenAI circuit is open")
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            if pause > deadline - time.monotonic() - MIN_ATTEMPT_SECONDS:
+                self._reject(operation, "deadline", f"Retry-After pause of {pause:.1f}s outlasts the deadline")
+            time.sleep(pause)
+        if self._bucket is not None and not self._bucket.acquire(deadline):
+            self._reject(operation, "rate_limit", "no request token before the deadline")
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            self._reject(operation, "saturated", "no free Azure OpenAI slot before the deadline")
+
+    @staticmethod
+    def _reject(operation, reason, message):
+        # Never sent, so the breaker doesn't hear about it.
+        registry.inc("llm_rejected_total", (operation, reason))
+        raise LLMUnavailable(f"{operation}: {message}")
+
+    @staticmethod
+    def _safe_to_retry(operation, reason, error):
+        if operation in IDEMPOTENT_OPERATIONS or operation.rsplit(".", 1)[-1] in IDEMPOTENT_METHODS:
+            return True
+        if reason == "rate_limited":
+            return True
+        return reason in ("timeout", "connection") and type(error.__cause__).__name__ in NOT_SENT_ERRORS
+
+    @staticmethod
+    def _classify(error):
+        """Return ``(retry reason or None, Retry-After seconds or None)``."""
+        if isinstance(error, openai.APITimeoutError):
+            return "timeout", None
+        if isinstance(error, openai.APIConnectionError):
+            return "connection", None
+        if not isinstance(error, openai.APIStatusError):
+            return None, None
+        status = error.status_code
+        if status not in RETRYABLE_STATUS and status < 500:
+            return None, None
+        return ("rate_limited" if status == 429 else f"http_{status}"), _retry_after(error.response.headers)
+
+
+def _retry_after(headers):
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(parsed.timestamp() - time.time(), 0) if parsed else None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide Azure OpenAI client shared by the app and all agents."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+def _build_client():
+    max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    attempt_timeout = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "90"))
+    # Built from the SDK's own defaults so they match whichever httpx it was built on.
+    timeout = type(openai.DEFAULT_TIMEOUT)(attempt_timeout, connect=float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5")))
+    limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=max_concurrency,
+        max_keepalive_connections=max_concurrency,
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+    )
+    client = openai.AzureOpenAI(
+        api_key=os.getenv("AZURE_OPENAI_KEY"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-05-01-preview"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        default_headers={"azure-openai-deployment": os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")},
+        max_retries=0,  # retried here, with a shared deadline and breaker
+        timeout=timeout,
+        http_client=openai.DefaultHttpxClient(limits=limits, timeout=timeout)
+    )
+    return ResilientClient(
+        client,
+        max_concurrency=max_concurrency,
+        requests_per_second=float(os.getenv("LLM_REQUESTS_PER_SECOND", "0")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+        backoff_base=float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5")),
+        backoff_max=float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20")),
+        attempt_timeout=attempt_timeout,
+        deadline_seconds=float(os.getenv("LLM_DEADLINE_SECONDS", "150")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+        )
+    )
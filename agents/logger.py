@@ -1,17 +1,116 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import sys
+import threading
+from agents.tracing import TraceIdFilter
+from agents.metrics import ErrorCountHandler
+
+# Records are queued on the calling thread and written by one background listener,
+# so file I/O and message formatting stay off the request path.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "1") != "0"
+# Share of large payloads (prompts, completions) logged at INFO when DEBUG is off.
+PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+
+FORMAT = '%(asctime)s - %(levelname)s - [%(trace_id)s] - %(message)s'
+
+_lock = threading.Lock()
+_queue = None
+_listener = None
+_listener_pid = None
+_files = {}
+dropped_records = 0
+
+
+class _FileRouter(logging.Handler):
+    """Runs on the listener thread; writes each record to its logger's rotating file."""
+
+    def emit(self, record):
+        handler = _files.get(record.name)
+        if handler is not None:
+            handler.handle(record)
+
+
+class _AsyncQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Formatting happens on the listener thread; only the trace id is captured here.
+        return record
+
+    def enqueue(self, record):
+        global dropped_records
+        if _listener_pid != os.getpid():
+            _start_listener()  # forked worker process: the parent's listener thread didn't come along
+        try:
+            _queue.put_nowait(record)
+        except queue.Full:
+            dropped_records += 1  # never block a request on logging
+
+
+def _start_listener():
+    global _queue, _listener, _listener_pid
+    with _lock:
+        if _listener_pid == os.getpid():
+            return
+        _queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handlers = [_FileRouter()]
+        if LOG_CONSOLE:
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(logging.Formatter(FORMAT))
+            handlers.append(console)
+        _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _listener_pid = os.getpid()
+        atexit.register(_listener.stop)
+
 
 def get_logger(name, logfile_path):
     os.makedirs(os.path.dirname(logfile_path), exist_ok=True)
 
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(LOG_LEVEL)
 
     # Prevent adding duplicate handlers
     if not logger.handlers:
-        handler = logging.FileHandler(logfile_path, encoding='utf-8')  # ✅ Use UTF-8
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
+        if LOG_MAX_BYTES:
+            file_handler = logging.handlers.RotatingFileHandler(
+                logfile_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+            )
+        else:
+            file_handler = logging.FileHandler(logfile_path, encoding='utf-8')  # ✅ Use UTF-8
+        file_handler.setFormatter(logging.Formatter(FORMAT))
+        _files[name] = file_handler
+
+        _start_listener()
+        handler = _AsyncQueueHandler(None)
+        handler.addFilter(TraceIdFilter())
         logger.addHandler(handler)
+        logger.addHandler(ErrorCountHandler())
+        # Console output goes through the listener too, not the root handler.
+        logger.propagate = False
 
     return logger
+
+
+def log_payload(logger, label, payload):
+    """Log a large payload (prompt, completion, dataset) without paying for it when unused.
+
+    Emitted at DEBUG when that level is enabled; otherwise at INFO for a
+    ``LOG_PAYLOAD_SAMPLE_RATE`` share of calls. ``payload`` may be a
+    zero-argument callable so expensive serialization only runs when the
+    line is actually written.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        level = logging.DEBUG
+    elif PAYLOAD_SAMPLE_RATE and random.random() < PAYLOAD_SAMPLE_RATE and logger.isEnabledFor(logging.INFO):
+        level = logging.INFO
+        label += " (sampled)"
+    else:
+        return
+    logger.log(level, "%s:\n%s", label, payload() if callable(payload) else payload)
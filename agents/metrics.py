@@ -0,0 +1,261 @@
+import functools
+import glob
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from pymongo import monitoring
+
+# Seconds; spans a Mongo round trip up to a slow assistant run.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and latency histograms, rendered in Prometheus text format.
+
+    Series are keyed by metric name and a tuple of label values. With
+    ``multiproc_dir`` set (one directory shared by every gunicorn worker),
+    each process writes a snapshot of its series to ``<pid>.json`` there at
+    most every ``flush_interval`` seconds, and ``render`` sums counters and
+    histograms across all snapshots, so every scrape sees the whole service
+    whichever worker serves it. Gauges are per process and get a ``pid``
+    label. The directory must be emptied before the server starts.
+    Without it, a scrape reports only the worker that served it.
+    """
+
+    def __init__(self, multiproc_dir=None, flush_interval=5.0):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._next_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def describe(self, name, kind, help_text, label_names):
+        self._help[name] = (kind, help_text, label_names)
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            histogram = self._histograms.setdefault(name, {}).get(labels)
+            if histogram is None:
+                histogram = self._histograms[name][labels] = Histogram()
+            histogram.observe(value)
+        self._maybe_flush()
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+        self._maybe_flush()
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._counters.setdefault(name, {})[labels] = value
+        self._maybe_flush()
+
+    # ===== Multi-process snapshots =====
+    def _snapshot(self):
+        with self._lock:
+            return {
+                "counters": {
+                    name: [[list(labels), value] for labels, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                "histograms": {
+                    name: [[list(labels), h.counts, h.total, h.count] for labels, h in series.items()]
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def _maybe_flush(self):
+        if self.multiproc_dir and time.monotonic() >= self._next_flush:
+            self._next_flush = time.monotonic() + self.flush_interval
+            self.flush()
+
+    def flush(self):
+        """Write this process's snapshot to ``multiproc_dir`` (atomically replacing the last one)."""
+        path = os.path.join(self.multiproc_dir, f"{os.getpid()}.json")
+        with self._flush_lock:
+            try:
+                os.makedirs(self.multiproc_dir, exist_ok=True)
+                with open(path + ".tmp", "w") as f:
+                    json.dump(self._snapshot(), f)
+                os.replace(path + ".tmp", path)
+            except OSError:
+                pass  # metrics must never break a request; the next flush retries
+
+    def _collect(self):
+        """``(counters, histograms)`` summed over every process, or this one's alone."""
+        if not self.multiproc_dir:
+            snapshots = [(None, self._snapshot())]
+        else:
+            self.flush()
+            snapshots = []
+            for path in glob.glob(os.path.join(self.multiproc_dir, "*.json")):
+                try:
+                    with open(path) as f:
+                        snapshots.append((os.path.basename(path)[:-5], json.load(f)))
+                except (OSError, ValueError):
+                    continue
+
+        counters, histograms = {}, {}
+        for pid, snapshot in snapshots:
+            for name, series in snapshot.get("counters", {}).items():
+                gauge = self._help.get(name, ("counter",))[0] == "gauge"
+                merged = counters.setdefault(name, {})
+                for labels, value in series:
+                    if gauge:
+                        merged[tuple(labels) + ((pid,) if pid else ())] = value
+                    else:
+                        merged[tuple(labels)] = merged.get(tuple(labels), 0) + value
+            for name, series in snapshot.get("histograms", {}).items():
+                merged = histograms.setdefault(name, {})
+                for labels, counts, total, count in series:
+                    previous = merged.get(tuple(labels))
+                    if previous:
+                        counts = [a + b for a, b in zip(previous[0], counts)]
+                        total, count = previous[1] + total, previous[2] + count
+                    merged[tuple(labels)] = (counts, total, count)
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self._collect()
+        lines = []
+        for name, (kind, help_text, label_names) in self._help.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for labels, (counts, total, count) in sorted(histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, bucket in zip(LATENCY_BUCKETS, counts):
+                        cumulative += bucket
+                        le = 'le="%s"' % bound
+                        lines.append(f"{name}_bucket{_labels(label_names, labels, le)} {cumulative}")
+                    le = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{_labels(label_names, labels, le)} {count}")
+                    lines.append(f"{name}_sum{_labels(label_names, labels)} {total:.6f}")
+                    lines.append(f"{name}_count{_labels(label_names, labels)} {count}")
+            else:
+                if kind == "gauge" and self.multiproc_dir:
+                    label_names = tuple(label_names) + ("pid",)
+                for labels, value in sorted(counters.get(name, {}).items()):
+                    lines.append(f"{name}{_labels(label_names, labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(
+    multiproc_dir=os.getenv("METRICS_MULTIPROC_DIR") or None,
+    flush_interval=float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+)
+registry.describe("stage_latency_seconds", "histogram", "Latency of agent stages.", ("stage",))
+registry.describe("stage_errors_total", "counter", "Exceptions raised by agent stages.", ("stage",))
+registry.describe("llm_tokens_total", "counter", "LLM tokens used per stage.", ("stage", "kind"))
+registry.describe("mongo_command_latency_seconds", "histogram", "Latency of MongoDB commands.", ("command",))
+registry.describe("mongo_command_failures_total", "counter", "Failed MongoDB commands.", ("command",))
+registry.describe("logged_errors_total", "counter", "ERROR log records per logger (includes handled failures).", ("logger",))
+registry.describe("http_request_latency_seconds", "histogram", "Latency of HTTP requests (until the view returns).", ("endpoint", "status"))
+registry.describe("llm_retries_total", "counter", "Retried Azure OpenAI calls.", ("operation", "reason"))
+registry.describe("llm_rejected_total", "counter", "Azure OpenAI calls failed fast without being sent.", ("operation", "reason"))
+registry.describe("llm_circuit_state", "gauge", "Azure OpenAI circuit breaker (0 closed, 1 half-open, 2 open).", ())
+
+
+def record_stage(stage, seconds, error=False):
+    registry.observe("stage_latency_seconds", (stage,), seconds)
+    if error:
+        registry.inc("stage_errors_total", (stage,))
+
+
+def record_tokens(stage, prompt_tokens, completion_tokens):
+    if prompt_tokens:
+        registry.inc("llm_tokens_total", (stage, "prompt"), prompt_tokens)
+    if completion_tokens:
+        registry.inc("llm_tokens_total", (stage, "completion"), completion_tokens)
+
+
+def record_request(endpoint, status, seconds):
+    registry.observe("http_request_latency_seconds", (endpoint, str(status)), seconds)
+
+
+def timed(stage):
+    """Decorator recording latency and exceptions of a function under ``stage``.
+
+    Generator functions are timed from the first ``next`` until they finish
+    or are closed.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def gen_wrapper(*args, **kwargs):
+                start, failed = time.perf_counter(), False
+                try:
+                    yield from func(*args, **kwargs)
+                except BaseException as e:
+                    failed = not isinstance(e, GeneratorExit)
+                    raise
+                finally:
+                    record_stage(stage, time.perf_counter() - start, failed)
+            return gen_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start, failed = time.perf_counter(), False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                record_stage(stage, time.perf_counter() - start, failed)
+        return wrapper
+    return decorator
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding per-command latency and failure counts."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        registry.observe("mongo_command_latency_seconds", (event.command_name,), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        registry.observe("mongo_command_latency_seconds", (event.command_name,), event.duration_micros / 1e6)
+        registry.inc("mongo_command_failures_total", (event.command_name,))
+
+
+class ErrorCountHandler(logging.Handler):
+    """Counts ERROR records, since most agents catch their exceptions and log them instead."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record):
+        registry.inc("logged_errors_total", (record.name,))
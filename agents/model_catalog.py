@@ -0,0 +1,172 @@
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import namedtuple
+from pymongo.errors import PyMongoError
+from agents.db import get_recommender_collection
+from agents.logger import get_logger
+
+logger = get_logger("model_catalog", "logs/model_catalog.log")
+
+# The catalog has been written with more than one spelling of the name field.
+MODEL_NAME_KEYS = ("Model_name", "Model_Name", "Model Name")
+
+
+def model_name(model):
+    """Return the display name of a catalog or recommendation entry."""
+    for key in MODEL_NAME_KEYS:
+        if model.get(key):
+            return str(model[key])
+    return ""
+
+
+def normalize_model_name(name):
+    return " ".join(str(name or "").lower().split())
+
+
+# One loaded catalog. Never mutated: a reload swaps in a new one.
+CatalogSnapshot = namedtuple("CatalogSnapshot", ["models", "by_name", "version"])
+
+
+class ModelCatalog:
+    """Process-wide cache of the recommender model collection.
+
+    The collection is loaded once and served from memory until the TTL
+    expires or the change-stream watcher sees a write. A reload that finds
+    different content bumps ``version`` so dependent caches can tell when
+    they are stale. Models, name index and version are published together
+    as one ``CatalogSnapshot``, so a reader never pairs one load's models
+    with another's version.
+    """
+
+    def __init__(self, collection, ttl_seconds=300, poll_interval=30):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+
+        self._lock = threading.RLock()
+        self._snapshot = CatalogSnapshot((), {}, 0)
+        self._loaded_at = 0.0
+        self._stale = True
+        self._digest = None
+        self._doc_count = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def _is_expired(self):
+        return self._stale or (time.monotonic() - self._loaded_at) > self.ttl_seconds
+
+    def refresh(self):
+        with self._lock:
+            try:
+                data = list(self.collection.find({}, {"_id": 0}))
+            except PyMongoError as e:
+                logger.error(f"❌ MongoDB fetch error: {e}")
+                # Keep serving the previous snapshot rather than an empty catalog.
+                return self._snapshot
+
+            self._doc_count = len(data)
+            self._loaded_at = time.monotonic()
+            self._stale = False
+
+            digest = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            if digest == self._digest:
+                logger.info(f"✅ Catalog unchanged after reload (version {self._snapshot.version}).")
+                return self._snapshot
+
+            by_name = {}
+            for model in data:
+                name = normalize_model_name(model_name(model))
+                if name:
+                    by_name.setdefault(name, model)
+
+            self._snapshot = CatalogSnapshot(tuple(data), by_name, self._snapshot.version + 1)
+            self._digest = digest
+            logger.info(f"✅ Loaded {len(data)} models into catalog cache (version {self._snapshot.version}).")
+            return self._snapshot
+
+    def _ensure_fresh(self):
+        self._ensure_watcher()
+        if self._is_expired():
+            with self._lock:
+                if self._is_expired():
+                    self.refresh()
+
+    def snapshot(self):
+        """Current ``CatalogSnapshot``, loading it first if needed."""
+        self._ensure_fresh()
+        return self._snapshot
+
+    def get_models(self):
+        return list(self.snapshot().models)
+
+    def get_by_name(self, name):
+        return self.snapshot().by_name.get(normalize_model_name(name))
+
+    def current_version(self):
+        """Version of the catalog content, loading it first if needed."""
+        return self.snapshot().version
+
+    def invalidate(self):
+        self._stale = True
+
+    # ===== Invalidation =====
+    def _ensure_watcher(self):
+        if self._watcher is not None:
+            return
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="model-catalog-watcher", daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        try:
+            with self.collection.watch() as stream:
+                logger.info("👀 Watching catalog collection via change stream.")
+                for change in stream:
+                    logger.info(f"🔄 Catalog change detected ({change.get('operationType')}). Invalidating cache.")
+                    self.invalidate()
+                    if self._stop.is_set():
+                        return
+        except PyMongoError as e:
+            # Change streams need a replica set; standalone servers fall back to polling.
+            logger.warning(f"⚠️ Change stream unavailable ({e}). Falling back to version polling.")
+        self._poll()
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                count = self.collection.estimated_document_count()
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Catalog poll failed: {e}")
+                continue
+            if self._doc_count is not None and count != self._doc_count:
+                logger.info(f"🔄 Catalog size changed ({self._doc_count} -> {count}). Invalidating cache.")
+                self.invalidate()
+
+    def close(self):
+        self._stop.set()
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_model_catalog():
+    """Return the shared catalog, creating it from the environment on first use."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ModelCatalog(
+                    get_recommender_collection(),
+                    ttl_seconds=int(os.getenv("MODEL_CATALOG_TTL_SECONDS", "300")),
+                    poll_interval=int(os.getenv("MODEL_CATALOG_POLL_SECONDS", "30")),
+                )
+    return _catalog
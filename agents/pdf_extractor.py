@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import PyPDF2
+from agents.logger import get_logger
+from agents.tokens import count_tokens
+
+logger = get_logger("pdf_extractor", "logs/pdf_extractor.log")
+
+# Never fork the web worker itself: a lock held by one of its threads at fork time
+# (Mongo pool, metrics registry, log queue) would stay locked forever in the child.
+MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+if MP_CONTEXT.get_start_method() == "forkserver":
+    # Same preload as the extraction pool (one fork server serves both); never __main__.
+    MP_CONTEXT.set_forkserver_preload(["agents.file_readers"])
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """Process pool shared by every PDF in this process, created on first use (and again after a fork)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=MP_CONTEXT)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken pool (a child died) so the next ``_get_pool`` builds a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _submit(workers, path, start, stop):
+    """Submit one page range; returns ``(pool, future)`` so a broken pool can be discarded later."""
+    pool = _get_pool(workers)
+    try:
+        return pool, pool.submit(_extract_range, path, start, stop)
+    except BrokenProcessPool:
+        logger.warning("⚠️ PDF pool is broken. Recreating it.")
+        _discard_pool(pool)
+        pool = _get_pool(workers)
+        return pool, pool.submit(_extract_range, path, start, stop)
+
+
+def _result(workers, path, start, stop, pool, future):
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+    # A child died, maybe on another range; retry this one once in a fresh pool. Never in-process:
+    # a crash in the PDF parser would take the web worker down with it.
+    logger.warning(f"⚠️ PDF pool broke on pages {start + 1}-{stop}. Retrying them in a fresh pool.")
+    pool, future = _submit(workers, path, start, stop)
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        logger.error(f"❌ Skipping pages {start + 1}-{stop}: the extraction process died twice.")
+        return []
+
+
+def _extract_range(path, start, stop):
+    """Extract pages ``[start, stop)``; runs in a worker process with its own reader."""
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_count(path):
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def iter_pdf_pages(path, max_tokens=0, workers=1, pages_per_chunk=16):
+    """Yield the text of each non-empty page in order.
+
+    Page ranges of ``pages_per_chunk`` are extracted in parallel across
+    ``workers`` processes of a pool shared with other PDFs (sized by the
+    first caller), with at most two ranges per worker in flight.
+    Once ``max_tokens`` (0 = unlimited) have been yielded, outstanding
+    ranges are cancelled and the generator stops.
+    """
+    total = _page_count(path)
+    ranges = [(start, min(start + pages_per_chunk, total)) for start in range(0, total, pages_per_chunk)]
+    used = 0
+
+    def within_budget(text):
+        nonlocal used
+        used += count_tokens(text)
+        return not max_tokens or used < max_tokens
+
+    if workers <= 1 or len(ranges) <= 1:
+        for start, stop in ranges:
+            for text in _extract_range(path, start, stop):
+                if text:
+                    yield text
+                    if not within_budget(text):
+                        logger.info(f"✂️ Token budget reached at page {start + 1}-{stop} of {total}.")
+                        return
+        return
+
+    pending = deque()
+    todo = iter(ranges)
+    try:
+        for _ in range(workers * 2):
+            next_range = next(todo, None)
+            if next_range:
+                pending.append((next_range, *_submit(workers, path, *next_range)))
+
+        while pending:
+            (start, stop), pool, future = pending.popleft()
+            next_range = next(todo, None)
+            if next_range:
+                pending.append((next_range, *_submit(workers, path, *next_range)))
+            for text in _result(workers, path, start, stop, pool, future):
+                if text:
+                    yield text
+                    if not within_budget(text):
+                        logger.info(f"✂️ Token budget reached at pages {start + 1}-{stop} of {total}.")
+                        return
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+
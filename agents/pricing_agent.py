@@ -1,25 +1,68 @@
+import os
 import time
-from openai import AzureOpenAI
-from agents.logger import get_logger
+from agents.logger import get_logger, log_payload
+from agents.metrics import timed
+from agents.model_catalog import model_name, normalize_model_name
+from agents.pricing_cache import (
+    match_pricing_rows, parse_pricing_table, render_pricing_table, unavailable_pricing_row
+)
+from agents.tokens import record_usage
 
 logger = get_logger("pricing_agent", "logs/pricing_agent.log")
 
+TERMINAL_RUN_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete", "requires_action"}
+POLL_BACKOFF = 1.5
+
 class PricingAgent:
-    def __init__(self, assistant_id, azure_api_key, azure_endpoint, api_version="2024-05-01-preview"):
+    def __init__(self, gpt_client, assistant_id, pricing_cache=None):
         logger.info("✅ Initializing PricingAgent...")
+        self.client = gpt_client
         self.assistant_id = assistant_id
-        self.client = AzureOpenAI(
-            api_key=azure_api_key,
-            azure_endpoint=azure_endpoint,
-            api_version=api_version
-        )
+        self.pricing_cache = pricing_cache
+        self.run_timeout = float(os.getenv("PRICING_RUN_TIMEOUT_SECONDS", "60"))
+        self.poll_initial = float(os.getenv("PRICING_POLL_INITIAL_SECONDS", "0.25"))
+        self.poll_max = float(os.getenv("PRICING_POLL_MAX_SECONDS", "2"))
 
+    @timed("pricing")
     def analyze_pricing(self, model_list):
         logger.info("===== Step 3: Pricing Analysis Started =====")
-        logger.info("Received model shortlist for pricing:")
-        for model in model_list:
-            logger.info(f"   - {model}")
+        log_payload(logger, "Received model shortlist for pricing", lambda: "\n".join(f"   - {model}" for model in model_list))
+
+        names = [model_name(model) for model in model_list if model_name(model)]
+        if self.pricing_cache is None or not names:
+            return self._ask_assistant(model_list)
 
+        # Only models missing from the cache go to the assistant
+        hits, misses = self.pricing_cache.get_many(names)
+        if misses:
+            response = self._ask_assistant(misses)
+            fresh_rows = parse_pricing_table(response)
+            if not fresh_rows and not hits:
+                return response  # nothing cached and nothing parseable; pass the reply through
+            # Cache under the requested names, whatever the assistant called the models. Positional
+            # guesses and rows for models nobody asked about are shown once but never cached.
+            matched, guessed, extra = match_pricing_rows(fresh_rows, misses)
+            if matched:
+                self.pricing_cache.put_many(list(matched.values()))
+            if guessed:
+                logger.warning(f"⚠️ Matched {len(guessed)} pricing row(s) by position only; not caching them.")
+            for row in list(matched.values()) + list(guessed.values()) + extra:
+                hits.setdefault(normalize_model_name(row["model"]), row)
+            # Never drop a model silently: the report must show which prices are missing (not cached).
+            unpriced = [name for name in misses if normalize_model_name(name) not in hits]
+            if unpriced:
+                logger.warning(f"⚠️ No pricing for {len(unpriced)} model(s), using placeholders: {', '.join(unpriced)}")
+                for name in unpriced:
+                    hits[normalize_model_name(name)] = unavailable_pricing_row(name)
+
+        # Rebuild the table in recommendation order, then any extra rows the assistant added
+        ordered = [hits.pop(normalize_model_name(name)) for name in names if normalize_model_name(name) in hits]
+        table = render_pricing_table(ordered + list(hits.values()))
+        log_payload(logger, "✅ Pricing table (cache + assistant)", table)
+        return table
+
+    @timed("pricing_assistant")
+    def _ask_assistant(self, model_list):
         # Build GPT prompt for assistant
         prompt = (
             "You are a pricing analyst AI. Your task is to analyze and estimate pricing info for ONLY the models listed below.\n\n"
@@ -39,47 +82,73 @@ class PricingAgent:
             "\n".join(f"- {model}" for model in model_list)
         )
 
-        logger.info("📝 Prepared prompt for assistant:\n" + prompt)
-
-        # Create assistant thread
-        thread = self.client.beta.threads.create()
-        logger.info(f"🧵 Created assistant thread ID: {thread.id}")
+        log_payload(logger, "📝 Prepared prompt for assistant", prompt)
 
-        # Send message
-        self.client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=prompt
+        # Create thread, post the prompt and start the run in one round trip
+        run = self.client.beta.threads.create_and_run(
+            assistant_id=self.assistant_id,
+            thread={"messages": [{"role": "user", "content": prompt}]}
         )
-        logger.info("📤 Sent prompt to assistant.")
-
-        # Run assistant
-        run = self.client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=self.assistant_id
-        )
-        logger.info(f"🏃 Assistant run started. Run ID: {run.id}")
+        logger.info(f"🏃 Assistant run started. Thread ID: {run.thread_id}, Run ID: {run.id}")
 
         # Poll for completion
         logger.info("⏳ Waiting for assistant to finish...")
-        while run.status not in ["completed", "failed"]:
-            time.sleep(2)
-            run = self.client.beta.threads.runs.retrieve(
-                thread_id=thread.id,
-                run_id=run.id
-            )
+        run = self._wait_for_run(run)
+
+        record_usage("pricing", getattr(run, "usage", None))
 
         # Failure check
-        if run.status == "failed":
-            logger.error("❌ Assistant run failed.")
+        if run.status != "completed":
+            logger.error(f"❌ Assistant run ended with status '{run.status}'.")
             return "Assistant failed to analyze pricing."
 
-        # Get assistant's reply
-        messages = self.client.beta.threads.messages.list(thread_id=thread.id)
+        # Get assistant's reply (only the newest message of this run)
+        messages = self.client.beta.threads.messages.list(
+            thread_id=run.thread_id,
+            run_id=run.id,
+            order="desc",
+            limit=1
+        )
         response = ""
         for msg in messages.data:
             if msg.role == "assistant":
-                response += msg.content[0].text.value
+                response = "".join(part.text.value for part in msg.content if part.type == "text")
 
-        logger.info("✅ Assistant Pricing Table Response:\n" + response)
+        log_payload(logger, "✅ Assistant Pricing Table Response", response)
         return response
+
+    def _wait_for_run(self, run):
+        """Poll a run with adaptive backoff until it ends or the deadline passes.
+
+        Polling starts fast (most pricing runs finish within a few seconds) and
+        backs off geometrically. A run still going at the deadline is cancelled.
+        """
+        deadline = time.monotonic() + self.run_timeout
+        delay = self.poll_initial
+        while run.status not in TERMINAL_RUN_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error(f"⌛ Assistant run exceeded {self.run_timeout}s. Cancelling.")
+                return self._cancel_run(run)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * POLL_BACKOFF, self.poll_max)
+            run = self.client.beta.threads.runs.retrieve(
+                thread_id=run.thread_id,
+                run_id=run.id
+            )
+
+        if run.status == "requires_action":
+            # The pricing assistant has no tools wired up here, so it can never resume.
+            logger.error("❌ Assistant run requested tool calls. Cancelling.")
+            return self._cancel_run(run)
+        return run
+
+    def _cancel_run(self, run):
+        try:
+            return self.client.beta.threads.runs.cancel(
+                thread_id=run.thread_id,
+                run_id=run.id
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to cancel assistant run {run.id}: {e}")
+            return run
@@ -0,0 +1,150 @@
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from pymongo.errors import PyMongoError
+from agents.logger import get_logger
+from agents.model_catalog import normalize_model_name
+
+logger = get_logger("pricing_cache", "logs/pricing_cache.log")
+
+PRICING_COLUMNS = ("model", "price", "unit", "provider", "region")
+TABLE_HEADER = (
+    "| Model | Estimated Price | Price Unit | Provider | Region |\n"
+    "|-------|------------------|------------|----------|--------|"
+)
+
+
+def parse_pricing_table(markdown):
+    """Parse the assistant's markdown pricing table into row dicts."""
+    rows = []
+    for line in (markdown or "").splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            continue
+        cells = [cell.strip() for cell in line.strip("|").split("|")]
+        if len(cells) != len(PRICING_COLUMNS):
+            continue
+        if cells[0].lower() == "model" or not cells[0].strip("-: "):
+            continue  # header or separator row
+        rows.append(dict(zip(PRICING_COLUMNS, cells)))
+    return rows
+
+
+def _loose_model_key(name):
+    """Name with parenthesized notes, punctuation and spacing removed.
+
+    "GPT-4o (OpenAI)" and "gpt 4o" both become "gpt4o".
+    """
+    return re.sub(r"[^0-9a-z]", "", re.sub(r"\([^)]*\)", "", str(name or "").lower()))
+
+
+def match_pricing_rows(rows, names):
+    """Pair assistant rows with the requested model names.
+
+    The assistant often rewrites names ("Whisper-Large-v3" comes back as
+    "Whisper Large v3"), so rows are matched on a loose key first; rows still
+    unmatched are paired by position when their count equals the count of
+    names still unmatched. Returns ``(matched, guessed, extra)``: rows by
+    requested name (``model`` set to that name) matched by key, the same for
+    positional guesses, and rows that fit no name. Only ``matched`` rows are
+    reliable enough to cache.
+    """
+    by_key = {}
+    for name in names:
+        by_key.setdefault(_loose_model_key(name), name)
+
+    matched, leftover = {}, []
+    for row in rows:
+        name = by_key.get(_loose_model_key(row.get("model")))
+        if name and name not in matched:
+            matched[name] = {**row, "model": name}
+        else:
+            leftover.append(row)
+
+    guessed = {}
+    unmatched = [name for name in names if name not in matched]
+    if leftover and len(leftover) == len(unmatched):
+        for name, row in zip(unmatched, leftover):
+            guessed[name] = {**row, "model": name}
+        leftover = []
+    return matched, guessed, leftover
+
+
+def unavailable_pricing_row(name):
+    return {"model": name, "price": "Pricing unavailable", "unit": "-", "provider": "-", "region": "-"}
+
+
+def render_pricing_table(rows):
+    lines = [TABLE_HEADER]
+    for row in rows:
+        lines.append("| " + " | ".join(row.get(col, "") for col in PRICING_COLUMNS) + " |")
+    return "\n".join(lines)
+
+
+class PricingCache:
+    """Per-model pricing rows, kept in memory and mirrored to MongoDB.
+
+    Keys are normalized model names. Mongo entries carry an ``expires_at``
+    date (TTL-indexed by ``agents.db.ensure_indexes``), so other workers and
+    restarts reuse them.
+    """
+
+    def __init__(self, collection=None, ttl_seconds=86400):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._memory = {}
+
+    def get_many(self, names):
+        """Return ``(hits, misses)``: cached rows by normalized name, and uncached names."""
+        now = time.time()
+        hits, misses = {}, []
+        with self._lock:
+            for name in names:
+                key = normalize_model_name(name)
+                entry = self._memory.get(key)
+                if entry and entry[0] > now:
+                    hits[key] = entry[1]
+                else:
+                    self._memory.pop(key, None)
+                    misses.append(name)
+
+        if misses and self.collection is not None:
+            keys = [normalize_model_name(name) for name in misses]
+            try:
+                docs = self.collection.find(
+                    {"_id": {"$in": keys}, "expires_at": {"$gt": datetime.utcnow()}}
+                )
+                for doc in docs:
+                    row = {col: doc.get(col, "") for col in PRICING_COLUMNS}
+                    hits[doc["_id"]] = row
+                    self._remember(doc["_id"], row, doc["expires_at"])
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Pricing cache lookup failed: {e}")
+            misses = [name for name in misses if normalize_model_name(name) not in hits]
+
+        logger.info(f"💾 Pricing cache: {len(hits)} hit(s), {len(misses)} miss(es).")
+        return hits, misses
+
+    def put_many(self, rows):
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        for row in rows:
+            key = normalize_model_name(row.get("model"))
+            if not key:
+                continue
+            self._remember(key, row, expires_at)
+            if self.collection is not None:
+                try:
+                    self.collection.update_one(
+                        {"_id": key},
+                        {"$set": {**row, "expires_at": expires_at}},
+                        upsert=True
+                    )
+                except PyMongoError as e:
+                    logger.warning(f"⚠️ Pricing cache write failed for {key}: {e}")
+
+    def _remember(self, key, row, expires_at):
+        ttl = (expires_at - datetime.utcnow()).total_seconds()
+        with self._lock:
+            self._memory[key] = (time.time() + ttl, row)
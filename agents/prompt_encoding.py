@@ -0,0 +1,95 @@
+import json
+import os
+from agents.logger import get_logger
+from agents.tokens import count_tokens
+
+logger = get_logger("prompt_encoding", "logs/prompt_encoding.log")
+
+MAX_VALUE_CHARS = int(os.getenv("PROMPT_VALUE_MAX_CHARS", "160"))
+ELLIPSIS = "…"
+
+# Per-stage prompt budgets in tokens; override with <STAGE>_PROMPT_MAX_TOKENS.
+DEFAULT_BUDGETS = {
+    "gatekeeper": 8000,
+    "recommender": 6000,
+    "report": 3000,
+    "follow_up": 1500,
+}
+
+
+def prompt_budget(stage):
+    return int(os.getenv(f"{stage.upper()}_PROMPT_MAX_TOKENS", DEFAULT_BUDGETS.get(stage, 8000)))
+
+
+def compact_json(value):
+    """JSON without indentation or spaces after separators."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def compact_value(value, max_chars=MAX_VALUE_CHARS):
+    """One-line text for a field value, cut to ``max_chars``."""
+    if value is None:
+        return ""
+    text = compact_json(value) if isinstance(value, (dict, list, tuple)) else str(value)
+    text = " ".join(text.split())
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars - 1].rstrip() + ELLIPSIS
+    return text
+
+
+def truncate_tokens(text, max_tokens):
+    """Cut ``text`` to roughly ``max_tokens`` tokens."""
+    size = count_tokens(text)
+    if not max_tokens or size <= max_tokens:
+        return text
+    return text[:len(text) * max_tokens // size].rstrip() + ELLIPSIS
+
+
+def _columns(records, fields):
+    if fields:
+        return list(fields)
+    # Keys in first-seen order, skipping columns that never hold a value.
+    columns = {}
+    for record in records:
+        for key, value in record.items():
+            if value not in (None, "", [], {}):
+                columns.setdefault(key, None)
+    return list(columns)
+
+
+def columnar_table(records, fields=None, max_chars=MAX_VALUE_CHARS, max_tokens=0):
+    """Encode records as a pipe-delimited table with the keys in one header row.
+
+    ``fields`` whitelists and orders the columns. With ``max_tokens`` set,
+    rows are added in order until the budget is spent, so pass records
+    best-first.
+    """
+    columns = _columns(records, fields)
+    header = " | ".join(columns)
+    lines, used = [header], count_tokens(header)
+    for record in records:
+        line = " | ".join(compact_value(record.get(col), max_chars).replace("|", "/") for col in columns)
+        size = count_tokens(line) + 1
+        if max_tokens and used + size > max_tokens:
+            logger.info(f"✂️ Table cut to {len(lines) - 1} of {len(records)} row(s) to fit {max_tokens} tokens.")
+            break
+        lines.append(line)
+        used += size
+    return "\n".join(lines)
+
+
+def compact_record(record, fields=None, max_chars=MAX_VALUE_CHARS):
+    """Encode one record as ``key: value`` lines."""
+    keys = fields or [key for key, value in record.items() if value not in (None, "", [], {})]
+    return "\n".join(f"{key}: {compact_value(record.get(key), max_chars)}" for key in keys)
+
+
+def check_prompt(stage, messages):
+    """Log the prompt size for ``stage`` and warn when it is over budget; returns the token count."""
+    used = sum(count_tokens(message["content"]) for message in messages)
+    budget = prompt_budget(stage)
+    if used > budget:
+        logger.warning(f"⚠️ {stage} prompt is {used} tokens, over its {budget} token budget.")
+    else:
+        logger.info(f"🧮 {stage} prompt: {used} tokens (budget {budget}).")
+    return used
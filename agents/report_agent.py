@@ -1,12 +1,22 @@
-import json
 from openai import AzureOpenAI  # Or from openai import OpenAI if not using Azure
-from agents.logger import get_logger
+from agents.logger import get_logger, log_payload
+from agents.metrics import timed
+from agents.tokens import count_tokens, record_usage
+from agents.prompt_encoding import check_prompt, columnar_table, prompt_budget, truncate_tokens
 
 logger = get_logger("report_agent", "logs/report_agent.log")
 
+# Approximate size of the fixed instructions in the report prompt.
+REPORT_OVERHEAD_TOKENS = 350
+REPORT_ERROR_MESSAGE = "Sorry, something went wrong while generating the final model selection report."
+
 class ReportAgent:
     def __init__(self, gpt_client):
         self.client = gpt_client
+        # Outcome of the last report: ``failed`` when the GPT call errored (the stream
+        # may have stopped part-way), ``completed`` only when GPT finished on its own.
+        self.failed = False
+        self.completed = False
         logger.info("✅ ReportAgent initialized with GPT client.")
 
     def is_valid_input(self, analyzed_input, recommended_models, pricing_table):
@@ -18,15 +28,18 @@ class ReportAgent:
             return False
         return True
 
-    def generate_report(self, analyzed_input, recommended_models, pricing_table):
-        # Step 1: Check if execution is necessary
-        if not self.is_valid_input(analyzed_input, recommended_models, pricing_table):
-            return "Skipping report generation. Input is not suitable or already narrowed to 1 model."
-
-        logger.info("📩 Generating final report using GPT...")
-        logger.debug(f"📝 Analyzed Input:\n{analyzed_input}")
-        logger.debug(f"📊 Recommended Models:\n{json.dumps(recommended_models, indent=2)}")
-        logger.debug(f"💰 Pricing Table:\n{json.dumps(pricing_table, indent=2)}")
+    def _build_messages(self, analyzed_input, recommended_models, pricing_table):
+        # Requirement and recommendations share the budget left after the pricing table and instructions.
+        budget = prompt_budget("report") - REPORT_OVERHEAD_TOKENS - count_tokens(pricing_table)
+        requirement = truncate_tokens(analyzed_input.strip(), max(budget // 2, 200))
+        recommendations = columnar_table(
+            recommended_models,
+            fields=["Model Name", "Reason"],
+            max_tokens=max(budget - count_tokens(requirement), 200)
+        )
+        log_payload(logger, "📝 Analyzed Input", requirement)
+        log_payload(logger, "📊 Recommended Models", recommendations)
+        log_payload(logger, "💰 Pricing Table", pricing_table)
 
         # Step 2: Prompt setup
         prompt = f"""
@@ -35,13 +48,13 @@ You are an expert AI model selector.
 Step 1: Review the full context.
 
 1. User Requirement:
-\"\"\"{analyzed_input.strip()}\"\"\"
+\"\"\"{requirement}\"\"\"
 
 2. Recommended Models (from Recommender):
-{json.dumps(recommended_models, indent=2)}
+{recommendations}
 
 3. Pricing & Specs (from PricingAgent):
-{json.dumps(pricing_table, indent=2)}
+{pricing_table}
 
 Step 2: Final Output Format (choose ONLY ONE best model):
 
@@ -60,34 +73,97 @@ Guidelines:
 - Keep formatting consistent and aligned.
 - Output must be professional text (no markdown, no emojis).
 """
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "You are a smart assistant generating final selection reports "
+                    "based on AI model recommendations. Output should be clean, aligned, and accurate."
+                )
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+    @timed("report")
+    def generate_report(self, analyzed_input, recommended_models, pricing_table):
+        # Step 1: Check if execution is necessary
+        if not self.is_valid_input(analyzed_input, recommended_models, pricing_table):
+            return "Skipping report generation. Input is not suitable or already narrowed to 1 model."
+
+        logger.info("📩 Generating final report using GPT...")
+        messages = self._build_messages(analyzed_input, recommended_models, pricing_table)
+        check_prompt("report", messages)
 
         try:
             response = self.client.chat.completions.create(
                 model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a smart assistant generating final selection reports "
-                            "based on AI model recommendations. Output should be clean, aligned, and accurate."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=messages,
                 temperature=0.4,
                 max_tokens=800
             )
 
+            record_usage("report", response.usage)
             result = response.choices[0].message.content.strip()
+            self.completed = response.choices[0].finish_reason != "length"
 
             logger.info("✅ Final model recommendation report generated successfully.")
-            logger.debug(f"📄 Final Report:\n{result}")
+            log_payload(logger, "📄 Final Report", result)
 
             return result
 
         except Exception as e:
             logger.error(f"❌ Error generating final report: {repr(e)}")
-            return "Sorry, something went wrong while generating the final model selection report."
+            self.failed = True
+            return REPORT_ERROR_MESSAGE
+
+    @timed("report")
+    def generate_report_stream(self, analyzed_input, recommended_models, pricing_table):
+        """Yield the final report in text chunks as GPT produces them.
+
+        A failure stops the stream without yielding an apology; check
+        ``failed`` afterwards, since the text so far is only a fragment.
+        """
+        if not self.is_valid_input(analyzed_input, recommended_models, pricing_table):
+            yield "Skipping report generation. Input is not suitable or already narrowed to 1 model."
+            return
+
+        logger.info("📩 Streaming final report using GPT...")
+        messages = self._build_messages(analyzed_input, recommended_models, pricing_table)
+        check_prompt("report", messages)
+
+        try:
+            stream = self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.4,
+                max_tokens=800,
+                stream=True
+            )
+            streamed = []
+            finish_reason = None
+            for chunk in stream:
+                # Azure sends a leading chunk with no choices (content filter results).
+                if not chunk.choices:
+                    continue
+                finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    streamed.append(delta)
+                    yield delta
+
+            # Streamed responses carry no usage block on this API version; count locally.
+            record_usage(
+                "report",
+                prompt_tokens=sum(count_tokens(m["content"]) for m in messages),
+                completion_tokens=count_tokens("".join(streamed))
+            )
+
+            self.completed = finish_reason != "length"
+            logger.info("✅ Final model recommendation report streamed successfully.")
+
+        except Exception as e:
+            logger.error(f"❌ Error streaming final report: {repr(e)}")
+            self.failed = True
@@ -1,9 +1,13 @@
 import sys
 import os
 import json
-import pymongo
 from dotenv import load_dotenv
-from agents.logger import get_logger
+from agents.logger import get_logger, log_payload
+from agents.metrics import timed
+from agents.model_catalog import get_model_catalog
+from agents.candidate_retriever import get_candidate_retriever
+from agents.tokens import count_tokens, record_usage
+from agents.prompt_encoding import check_prompt, columnar_table, prompt_budget, truncate_tokens
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -15,24 +19,33 @@ logger = get_logger("recommender_agent", "logs/recommender_agent.log")
 class RecommenderAgent:
     def __init__(self, gpt_client):
         self.client = gpt_client
-        self.mongo_uri = os.getenv("MONGO_URI")
-        self.db_name = os.getenv("RECOMMENDER_DB_NAME")
-        self.collection_name = os.getenv("RECOMMENDER_COLLECTION_NAME")
-
-        if not all([self.mongo_uri, self.db_name, self.collection_name]):
-            raise ValueError("MongoDB environment variables not set correctly in .env file.")
+        self.catalog = get_model_catalog()
+        self.top_k = int(os.getenv("RECOMMENDER_TOP_K", "12"))
+        # Optional whitelist of catalog fields sent to GPT, e.g. "Model_name,Task,Pricing,Region".
+        fields = os.getenv("RECOMMENDER_PROMPT_FIELDS", "")
+        self.prompt_fields = [f.strip() for f in fields.split(",") if f.strip()] or None
 
     def _fetch_model_dataset(self):
+        """Return the catalog as one snapshot, so its models and version always belong together."""
         try:
-            client = pymongo.MongoClient(self.mongo_uri)
-            db = client[self.db_name]
-            collection = db[self.collection_name]
-            data = list(collection.find({}, {"_id": 0}))
-            logger.info(f"✅ Fetched {len(data)} models from MongoDB.")
-            return data
+            snapshot = self.catalog.snapshot()
+            logger.info(f"✅ Fetched {len(snapshot.models)} models from catalog cache (version {snapshot.version}).")
+            return snapshot
         except Exception as e:
-            logger.error(f"❌ MongoDB fetch error: {e}")
-            return []
+            logger.error(f"❌ Model catalog error: {e}")
+            return None
+
+    def find_model(self, name):
+        """O(1) lookup of a catalog entry by (case-insensitive) model name."""
+        return self.catalog.get_by_name(name)
+
+    def _shortlist_candidates(self, analyzed_input, snapshot, exclude_model_name=None):
+        """Rank the catalog locally and keep only the top-K models for the prompt."""
+        retriever = get_candidate_retriever()
+        retriever.ensure_built(snapshot.models, snapshot.version)
+        candidates = retriever.top_k(analyzed_input, self.top_k, exclude=exclude_model_name)
+        logger.info(f"🔎 Shortlisted {len(candidates)} of {len(snapshot.models)} models for the prompt.")
+        return candidates
 
     def _is_model_request(self, analyzed_input: str) -> bool:
         """Check if input is relevant for model recommendation."""
@@ -42,6 +55,7 @@ class RecommenderAgent:
         ]
         return any(k in analyzed_input.lower() for k in keywords)
 
+    @timed("recommender")
     def recommend_models(self, analyzed_input: str, alternative_mode=False, exclude_model_name=None):
         # 🧠 Step 1: Input Check
         if not self._is_model_request(analyzed_input):
@@ -49,20 +63,24 @@ class RecommenderAgent:
             return [{"message": "No model recommendation needed based on your input."}]
 
         # 🧠 Step 2: Fetch Dataset
-        dataset = self._fetch_model_dataset()
-        if not dataset:
+        snapshot = self._fetch_model_dataset()
+        if snapshot is None or not snapshot.models:
             logger.warning("⚠️ Empty dataset. Cannot proceed.")
             return [{"message": "Model database is empty. Please try again later."}]
 
-        # 🧠 Step 3: Optional Alternative Filtering
-        if alternative_mode and exclude_model_name:
-            dataset = [model for model in dataset if model.get("Model_Name") != exclude_model_name]
-            logger.info(f"⚙️ Filtered out model: {exclude_model_name}")
+        # 🧠 Step 3: Local Candidate Retrieval (with optional alternative filtering)
+        excluded = exclude_model_name if alternative_mode else None
+        if excluded:
+            logger.info(f"⚙️ Filtering out model: {excluded}")
+        dataset = self._shortlist_candidates(analyzed_input, snapshot, excluded)
+        if not dataset:
+            logger.warning("⚠️ No candidate models left after filtering.")
+            return [{"message": "Model database is empty. Please try again later."}]
 
         # 🧠 Step 4: Prompt Construction
         system_prompt = (
             "You are an expert AI assistant trained to recommend the best AI models based on user needs.\n"
-            "- You will receive a JSON list of models and a user requirement.\n"
+            "- You will receive a table of candidate models (header row, then one model per row, '|' separated) and a user requirement.\n"
             "- Recommend ONLY 3 to 5 relevant models based on the task.\n"
             "- Output only a valid JSON list: each item must have 'Model Name' and 'Reason'.\n"
             "- Do not include irrelevant models.\n"
@@ -70,37 +88,46 @@ class RecommenderAgent:
             "- Make sure the response is always valid JSON. Do not include explanations outside the JSON.\n"
         )
 
-        user_prompt = (
-            f"User Requirement:\n"
-            f"{analyzed_input.strip()}\n\n"
-            f"Model Dataset:\n"
-            f"{json.dumps(dataset)}\n\n"
+        instructions = (
             "Instructions:\n"
             "- Match user task(s) with model capabilities.\n"
             "- Prioritize accuracy, budget, speed, and task-fit.\n"
-            "- Output format:\n"
-            "[\n"
-            "  {\n"
-            "    \"Model Name\": \"<model name>\",\n"
-            "    \"Reason\": \"<short reason for this task>\"\n"
-            "  },\n"
-            "  ... (up to 5 models)\n"
-            "]"
+            "- Output format (up to 5 models):\n"
+            '[{"Model Name": "<model name>", "Reason": "<short reason for this task>"}]'
+        )
+        # Requirement and candidate table share the budget left after the fixed instructions.
+        budget = prompt_budget("recommender") - count_tokens(system_prompt) - count_tokens(instructions)
+        requirement = truncate_tokens(analyzed_input.strip(), max(budget // 2, 200))
+        # Candidates are ranked best-first, so the table drops the weakest ones if the budget runs out.
+        table = columnar_table(
+            dataset,
+            fields=self.prompt_fields,
+            max_tokens=max(budget - count_tokens(requirement), 200)
+        )
+        user_prompt = (
+            f"User Requirement:\n"
+            f"{requirement}\n\n"
+            f"Model Dataset:\n"
+            f"{table}\n\n"
+            f"{instructions}"
         )
 
         # 🧠 Step 5: GPT Call
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        check_prompt("recommender", messages)
         try:
             response = self.client.chat.completions.create(
                 model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 temperature=0.7
             )
 
+            record_usage("recommender", response.usage)
             result = response.choices[0].message.content.strip()
-            logger.info("✅ Raw GPT Recommendation:\n" + result)
+            log_payload(logger, "✅ Raw GPT Recommendation", result)
 
             try:
                 recommendations = json.loads(result)
@@ -0,0 +1,90 @@
+import hashlib
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from agents.candidate_retriever import tokenize
+from agents.logger import get_logger
+
+logger = get_logger("response_cache", "logs/response_cache.log")
+
+
+def normalize_requirement(text):
+    return " ".join(tokenize(text))
+
+
+def _cosine(a, b):
+    common = set(a) & set(b)
+    if not common:
+        return 0.0
+    dot = sum(a[t] * b[t] for t in common)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    """LRU cache of finished agent-chain results, keyed by requirement + catalog version.
+
+    Lookups try an exact hash of the normalized requirement first. When
+    ``similarity_threshold`` is set, a miss falls back to the most similar
+    cached requirement (term-frequency cosine) under the same catalog version.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=3600, similarity_threshold=0.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(normalized, catalog_version):
+        return hashlib.sha256(f"{catalog_version}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, requirement, catalog_version):
+        normalized = normalize_requirement(requirement)
+        if not normalized:
+            return None
+        key = self._key(normalized, catalog_version)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires_at"] > now:
+                self._entries.move_to_end(key)
+                logger.info("⚡ Response cache exact hit.")
+                return entry["value"]
+            if entry:
+                del self._entries[key]
+
+            if self.similarity_threshold > 0:
+                query = Counter(normalized.split())
+                best_key, best_score = None, 0.0
+                for other_key, other in self._entries.items():
+                    if other["catalog_version"] != catalog_version or other["expires_at"] <= now:
+                        continue
+                    score = _cosine(query, other["terms"])
+                    if score > best_score:
+                        best_key, best_score = other_key, score
+                if best_key and best_score >= self.similarity_threshold:
+                    self._entries.move_to_end(best_key)
+                    logger.info(f"⚡ Response cache similarity hit (cosine {best_score:.3f}).")
+                    return self._entries[best_key]["value"]
+
+        return None
+
+    def put(self, requirement, catalog_version, value):
+        normalized = normalize_requirement(requirement)
+        if not normalized:
+            return
+        key = self._key(normalized, catalog_version)
+        with self._lock:
+            self._entries[key] = {
+                "value": value,
+                "terms": Counter(normalized.split()),
+                "catalog_version": catalog_version,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
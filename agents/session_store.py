@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pymongo.errors import PyMongoError
+from agents.logger import get_logger
+
+logger = get_logger("session_store", "logs/session_store.log")
+
+SESSION_FIELDS = ("selected_model_info", "last_user_task")
+
+
+def empty_session():
+    return {field: None for field in SESSION_FIELDS}
+
+
+class SessionStore:
+    """Per-user follow-up context (selected model and original task).
+
+    State is written through to MongoDB so any worker can serve the next
+    message. Reads go to Mongo by ``_id`` when a collection is configured;
+    the bounded in-memory LRU serves reads when there is no collection or
+    Mongo is unreachable.
+    """
+
+    def __init__(self, collection=None, max_entries=1024):
+        self.collection = collection
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+
+    def _remember(self, username, state):
+        with self._lock:
+            self._memory[username] = state
+            self._memory.move_to_end(username)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, username):
+        with self._lock:
+            state = self._memory.get(username)
+            if state is not None:
+                self._memory.move_to_end(username)
+                return dict(state)
+        return empty_session()
+
+    def load(self, username):
+        if self.collection is None:
+            return self._from_memory(username)
+        try:
+            doc = self.collection.find_one({"_id": username})
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Session load failed for {username}, using local copy: {e}")
+            return self._from_memory(username)
+
+        state = empty_session()
+        if doc:
+            state.update({field: doc.get(field) for field in SESSION_FIELDS})
+        self._remember(username, state)
+        return dict(state)
+
+    def save(self, username, state):
+        state = {field: state.get(field) for field in SESSION_FIELDS}
+        self._remember(username, state)
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_one(
+                {"_id": username},
+                {"$set": {**state, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except PyMongoError as e:
+            logger.error(f"❌ Session save failed for {username}: {e}")
+
+    def clear(self, username):
+        with self._lock:
+            self._memory.pop(username, None)
+        if self.collection is None:
+            return
+        try:
+            self.collection.delete_one({"_id": username})
+        except PyMongoError as e:
+            logger.error(f"❌ Session clear failed for {username}: {e}")
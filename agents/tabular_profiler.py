@@ -0,0 +1,194 @@
+import csv
+from collections import Counter
+from itertools import islice
+import numpy as np
+import pandas as pd
+from agents.logger import get_logger
+
+logger = get_logger("tabular_profiler", "logs/tabular_profiler.log")
+
+HEADER_SCAN_ROWS = 20
+QUANTILES = (0.25, 0.5, 0.75)
+TOP_CATEGORIES = 5
+MAX_TRACKED_CATEGORIES = 1000
+RESERVOIR_SIZE = 10000
+NUMERIC_SHARE = 0.9
+
+
+class ColumnProfile:
+    """Running statistics for one column, updated one chunk at a time.
+
+    Quantiles come from a fixed-size reservoir sample and category counts
+    are pruned to the most frequent values, so memory stays bounded no
+    matter how many rows stream through.
+    """
+
+    def __init__(self, name, rng):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.numeric = 0
+        self.min = None
+        self.max = None
+        self.total = 0.0
+        self.categories = Counter()
+        self.non_numeric = Counter()
+        self._rng = rng
+        self._reservoir = np.empty(0, dtype=np.float64)
+        self._seen_numeric = 0
+
+    def update(self, series):
+        self.rows += len(series)
+        present = series.dropna()
+        self.nulls += len(series) - len(present)
+        if present.empty:
+            return
+
+        coerced = pd.to_numeric(present, errors="coerce")
+        numbers = coerced.dropna().to_numpy(dtype=np.float64)
+        if len(numbers):
+            self.numeric += len(numbers)
+            low, high = float(numbers.min()), float(numbers.max())
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+            self.total += float(numbers.sum())
+            self._sample(numbers)
+
+        labels = present.astype(str).str.strip()
+        self.categories = self._count(self.categories, labels)
+        if len(numbers) < len(present):
+            self.non_numeric = self._count(self.non_numeric, labels[coerced.isna()])
+
+    @staticmethod
+    def _count(counter, labels):
+        counter.update(labels.value_counts().to_dict())
+        if len(counter) > MAX_TRACKED_CATEGORIES:
+            counter = Counter(dict(counter.most_common(MAX_TRACKED_CATEGORIES)))
+        return counter
+
+    def _sample(self, numbers):
+        # Vectorized reservoir sampling: value n (1-based, global) is kept with probability k/n.
+        room = RESERVOIR_SIZE - len(self._reservoir)
+        if room > 0:
+            self._reservoir = np.concatenate([self._reservoir, numbers[:room]])
+            self._seen_numeric += min(room, len(numbers))
+            numbers = numbers[room:]
+        if not len(numbers):
+            return
+        positions = self._seen_numeric + np.arange(1, len(numbers) + 1)
+        keep = self._rng.random(len(numbers)) < RESERVOIR_SIZE / positions
+        slots = self._rng.integers(0, RESERVOIR_SIZE, size=int(keep.sum()))
+        self._reservoir[slots] = numbers[keep]
+        self._seen_numeric += len(numbers)
+
+    @property
+    def kind(self):
+        present = self.rows - self.nulls
+        if not present:
+            return "empty"
+        # Mostly-numeric columns (e.g. marks with the odd "AB") are still profiled as numbers.
+        return "numeric" if self.numeric >= NUMERIC_SHARE * present else "text"
+
+    def describe(self):
+        line = f"- {self.name} ({self.kind}): {self.nulls} null(s) of {self.rows}"
+        if self.kind == "numeric":
+            q = np.quantile(self._reservoir, QUANTILES)
+            line += (
+                f"; min {self.min:g}, p25 {q[0]:g}, median {q[1]:g}, p75 {q[2]:g}, "
+                f"max {self.max:g}, mean {self.total / self.numeric:g}"
+            )
+            if self.non_numeric:
+                odd = ", ".join(f"{value[:40]} ({count})" for value, count in self.non_numeric.most_common(TOP_CATEGORIES))
+                line += f"; non-numeric: {odd}"
+        elif self.categories:
+            top = ", ".join(f"{value[:40]} ({count})" for value, count in self.categories.most_common(TOP_CATEGORIES))
+            line += f"; {len(self.categories)} distinct value(s) seen; top: {top}"
+        return line
+
+
+def _detect_header(head_rows):
+    """Pick the first row that is about as wide as the table (skips title rows)."""
+    widths = [sum(cell is not None and str(cell).strip() != "" for cell in row) for row in head_rows]
+    if not widths or max(widths) == 0:
+        return 0
+    threshold = max(widths) * 0.5
+    return next(i for i, width in enumerate(widths) if width >= threshold)
+
+
+def _column_names(header):
+    names, seen = [], Counter()
+    for i, cell in enumerate(header):
+        name = str(cell).strip() if cell is not None and str(cell).strip() else f"column_{i + 1}"
+        seen[name] += 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+def profile_rows(rows, title, chunk_rows=50000, sample_rows=5):
+    """Profile an iterator of row tuples, consuming it in DataFrame chunks."""
+    rows = iter(rows)
+    head = list(islice(rows, HEADER_SCAN_ROWS))
+    if not head:
+        return f"{title}: empty"
+
+    header_index = _detect_header(head)
+    columns = _column_names(head[header_index])
+    width = len(columns)
+    rng = np.random.default_rng(0)
+    profiles = [ColumnProfile(name, rng) for name in columns]
+    sample = None
+    row_count = 0
+
+    def normalize(row):
+        row = list(row[:width])
+        return row + [None] * (width - len(row))
+
+    remaining = (normalize(row) for row in head[header_index + 1:])
+    body = (normalize(row) for row in rows)
+    for source in (remaining, body):
+        while True:
+            chunk = list(islice(source, chunk_rows))
+            if not chunk:
+                break
+            frame = pd.DataFrame(chunk, columns=columns).replace(r"^\s*$", np.nan, regex=True)
+            frame = frame.dropna(how="all")
+            if frame.empty:
+                continue
+            if sample is None or len(sample) < sample_rows:
+                sample = frame.head(sample_rows) if sample is None else pd.concat([sample, frame]).head(sample_rows)
+            row_count += len(frame)
+            for name, profile in zip(columns, profiles):
+                profile.update(frame[name])
+
+    # Drop columns that never held a value (formatting-only columns in spreadsheets).
+    profiles = [p for p in profiles if p.rows - p.nulls > 0]
+    lines = [f"{title}: {row_count} rows x {len(profiles)} columns", "Columns:"]
+    lines.extend(p.describe() for p in profiles)
+    if sample is not None:
+        kept = [p.name for p in profiles]
+        lines.append(f"Sample rows (first {len(sample)}):")
+        lines.append(sample[kept].to_string(index=False, max_colwidth=40))
+    return "\n".join(lines)
+
+
+def profile_xlsx(path, chunk_rows=50000, sample_rows=5):
+    """Profile every sheet of a workbook using openpyxl's streaming read-only mode."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sections = [
+            profile_rows(sheet.iter_rows(values_only=True), f"Sheet '{sheet.title}'", chunk_rows, sample_rows)
+            for sheet in workbook.worksheets
+        ]
+    finally:
+        workbook.close()
+    logger.info(f"✅ Profiled {len(sections)} sheet(s) from {path}.")
+    return "\n\n".join(sections)
+
+
+def profile_csv(path, chunk_rows=50000, sample_rows=5):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        result = profile_rows(csv.reader(f), "CSV", chunk_rows, sample_rows)
+    logger.info(f"✅ Profiled CSV {path}.")
+    return result
@@ -0,0 +1,58 @@
+import contextvars
+import threading
+from agents.metrics import record_tokens
+
+# gpt-4o tokenizer when tiktoken is available; otherwise ~4 characters per token.
+_encoding = None
+_encoding_loaded = False
+_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+# ===== Per-request usage collection =====
+_usage = contextvars.ContextVar("token_usage", default=None)
+_usage_lock = threading.Lock()
+
+
+def start_usage_collection():
+    """Begin collecting token usage for the current request; returns the live dict."""
+    collected = {}
+    _usage.set(collected)
+    return collected
+
+
+def record_usage(stage, usage=None, prompt_tokens=0, completion_tokens=0):
+    """Add a response's usage (or explicit counts) to the current request's totals."""
+    if usage is not None:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    record_tokens(stage, prompt_tokens, completion_tokens)
+    collected = _usage.get()
+    if collected is None or not (prompt_tokens or completion_tokens):
+        return
+    with _usage_lock:
+        totals = collected.setdefault(stage, {"prompt_tokens": 0, "completion_tokens": 0})
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
@@ -0,0 +1,24 @@
+import contextvars
+import logging
+import uuid
+
+_trace_id = contextvars.ContextVar("trace_id", default="-")
+
+
+def new_trace_id(trace_id=None):
+    """Set the current request's trace id (a fresh one unless given) and return it."""
+    trace_id = (trace_id or uuid.uuid4().hex)[:64]
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def get_trace_id():
+    return _trace_id.get()
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamps every record with the trace id of the request that logged it."""
+
+    def filter(self, record):
+        record.trace_id = _trace_id.get()
+        return True
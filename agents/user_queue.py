@@ -0,0 +1,189 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from agents.logger import get_logger
+
+logger = get_logger("user_queue", "logs/user_queue.log")
+
+QUEUE_TIMEOUT_MESSAGE = "Your earlier messages are taking too long. Please try again shortly."
+
+
+class Ticket:
+    def __init__(self, username, number):
+        self.username = username
+        self.number = number
+        self.acquired = False
+
+
+class LocalUserQueue:
+    """Per-user FIFO of tickets for a single process.
+
+    Each user has a ``next`` ticket counter and a ``serving`` pointer; a
+    ticket may run once ``serving`` reaches it. Tickets released before
+    their turn are skipped.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._users = {}
+
+    def enter(self, username):
+        with self._cond:
+            state = self._users.setdefault(username, {"next": 0, "serving": 1, "abandoned": set()})
+            state["next"] += 1
+            return Ticket(username, state["next"])
+
+    def start(self):
+        pass
+
+    def poll(self, ticket):
+        """Return the ticket's queue position; 0 means it now holds the user's slot."""
+        with self._cond:
+            state = self._users[ticket.username]
+            position = ticket.number - state["serving"]
+            if position == 0:
+                ticket.acquired = True
+            return position
+
+    def wait(self, ticket, timeout):
+        with self._cond:
+            self._cond.wait(timeout)
+
+    def release(self, ticket):
+        with self._cond:
+            state = self._users.get(ticket.username)
+            if state is None:
+                return
+            if ticket.acquired:
+                state["serving"] += 1
+            else:
+                state["abandoned"].add(ticket.number)
+            while state["serving"] in state["abandoned"]:
+                state["abandoned"].discard(state["serving"])
+                state["serving"] += 1
+            if state["serving"] > state["next"]:
+                del self._users[ticket.username]  # idle user: drop the bookkeeping
+            self._cond.notify_all()
+
+
+class MongoUserQueue:
+    """Per-user FIFO shared by every worker through one Mongo document per user.
+
+    Document shape: ``{_id: username, next_ticket, serving, lease_expires,
+    abandoned}``. The ticket being served holds a lease; a heartbeat thread
+    (run by ``start``) renews the leases of every ticket this process holds
+    each ``heartbeat_seconds``, so a slow stage (a long LLM call) never lets
+    it lapse. If the lease does lapse (the worker died), the next waiter
+    advances ``serving`` past it.
+    """
+
+    def __init__(self, collection, lease_seconds=180, claim_seconds=15, poll_interval=0.5, heartbeat_seconds=None):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.claim_seconds = claim_seconds
+        self.poll_interval = poll_interval
+        self.heartbeat_seconds = heartbeat_seconds or max(lease_seconds / 4, 1)
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._heartbeat, name="user-queue-heartbeat", daemon=True).start()
+
+    def _lease_until(self, seconds=None):
+        return datetime.utcnow() + timedelta(seconds=seconds or self.lease_seconds)
+
+    def enter(self, username):
+        doc = self.collection.find_one_and_update(
+            {"_id": username},
+            {
+                "$inc": {"next_ticket": 1},
+                "$setOnInsert": {"serving": 1, "lease_expires": self._lease_until(), "abandoned": []}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return Ticket(username, doc["next_ticket"])
+
+    def poll(self, ticket):
+        doc = self.collection.find_one({"_id": ticket.username})
+        serving = doc["serving"]
+
+        if serving == ticket.number:
+            self.renew(ticket)
+            ticket.acquired = True
+            with self._lock:
+                self._held[id(ticket)] = ticket
+            return 0
+
+        if serving > ticket.number:
+            # Our lease was presumed dead and skipped; rejoin at the back.
+            logger.warning(f"⚠️ Ticket {ticket.number} for {ticket.username} was skipped. Re-queuing.")
+            ticket.number = self.enter(ticket.username).number
+            return self.poll(ticket)
+
+        if doc["lease_expires"] < datetime.utcnow():
+            logger.warning(f"⚠️ Lease for {ticket.username} ticket {serving} expired. Advancing queue.")
+            self._advance(doc, serving)
+            return self.poll(ticket)
+
+        return ticket.number - serving
+
+    def wait(self, ticket, timeout):
+        time.sleep(min(self.poll_interval, timeout))
+
+    def renew(self, ticket):
+        self.collection.update_one(
+            {"_id": ticket.username, "serving": ticket.number},
+            {"$set": {"lease_expires": self._lease_until()}}
+        )
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.heartbeat_seconds):
+            with self._lock:
+                held = list(self._held.values())
+            for ticket in held:
+                try:
+                    self.renew(ticket)
+                except PyMongoError as e:
+                    logger.warning(f"⚠️ Could not renew queue lease for {ticket.username}: {e}")
+
+    def _advance(self, doc, current):
+        abandoned = set(doc.get("abandoned", []))
+        serving = current + 1
+        while serving in abandoned:
+            serving += 1
+        # Compare-and-set on ``serving`` so concurrent advancers cannot skip twice.
+        # The next ticket gets a short claim window; it takes the full lease on its next poll.
+        self.collection.update_one(
+            {"_id": doc["_id"], "serving": current},
+            {
+                "$set": {"serving": serving, "lease_expires": self._lease_until(self.claim_seconds)},
+                "$pull": {"abandoned": {"$lt": serving}}
+            }
+        )
+
+    def release(self, ticket):
+        with self._lock:
+            self._held.pop(id(ticket), None)
+        try:
+            if ticket.acquired:
+                doc = self.collection.find_one({"_id": ticket.username})
+                if doc and doc["serving"] == ticket.number:
+                    self._advance(doc, ticket.number)
+            else:
+                doc = self.collection.find_one_and_update(
+                    {"_id": ticket.username},
+                    {"$addToSet": {"abandoned": ticket.number}},
+                    return_document=ReturnDocument.AFTER
+                )
+                if doc and doc["serving"] == ticket.number:
+                    self._advance(doc, ticket.number)
+        except PyMongoError as e:
+            # The lease will expire on its own and the next waiter will advance past us.
+            logger.error(f"❌ Failed to release queue ticket for {ticket.username}: {e}")
+
+    def shutdown(self):
+        self._stopped.set()
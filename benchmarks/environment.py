@@ -0,0 +1,78 @@
+"""Boots ``main_flask`` against mongomock and the fake OpenAI client."""
+import os
+import random
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+TASKS = ["summarization", "translation", "image generation", "speech to text", "ocr", "code generation",
+         "sentiment analysis", "question answering", "text to speech", "video understanding"]
+PROVIDERS = ["OpenAI", "Google", "Anthropic", "Mistral", "Meta", "Cohere"]
+REGIONS = ["Global", "US", "EU", "India", "US, EU"]
+
+BENCH_ENV = {
+    "MONGO_URI": "mongodb://benchmark",
+    "USER_DB_NAME": "bench_users",
+    "USERS_COLLECTION_NAME": "users",
+    "CHATS_COLLECTION_NAME": "chats",
+    "RECOMMENDER_DB_NAME": "bench_models",
+    "RECOMMENDER_COLLECTION_NAME": "models",
+    "AZURE_OPENAI_KEY": "benchmark",
+    "AZURE_OPENAI_ENDPOINT": "https://benchmark.openai.azure.com",
+    "AZURE_OPENAI_DEPLOYMENT_NAME": "gpt-4o",
+    "AZURE_OPENAI_ASSISTANT_ID": "asst_benchmark",
+    "USER_QUEUE_BACKEND": "local",
+    "LOG_CONSOLE": "0",
+}
+
+
+def synthetic_catalog(size, seed=0):
+    rng = random.Random(seed)
+    models = []
+    for i in range(size):
+        task = TASKS[i % len(TASKS)]
+        models.append({
+            "Model_name": f"{PROVIDERS[i % len(PROVIDERS)]}-{task.title().replace(' ', '')}-{i}",
+            "Task": task,
+            "Provider": PROVIDERS[i % len(PROVIDERS)],
+            "Region": rng.choice(REGIONS),
+            "Input Price": f"${rng.uniform(0.1, 20):.2f} / 1M tokens",
+            "Speed": rng.choice(["Fast", "Medium", "Slow"]),
+            "Accuracy": f"{rng.uniform(70, 99):.1f}%",
+            "Description": f"A {task} model tuned for production workloads with {rng.randint(1, 70)}B parameters.",
+        })
+    return models
+
+
+def boot(latency_scale=0.05, catalog_size=200, seed=0, profile=None):
+    """Patch external services, seed the catalog and import ``main_flask``.
+
+    Returns ``(main_flask, fake_client)``. Must run before anything imports
+    ``main_flask`` or the agents that build their own clients.
+    """
+    import mongomock
+    import openai
+    import pymongo
+    from benchmarks.fakes import FakeAzureOpenAI
+
+    os.environ.update(BENCH_ENV)
+
+    def no_change_streams(self, *args, **kwargs):
+        # Like a standalone mongod: the catalog watcher falls back to polling.
+        raise pymongo.errors.OperationFailure("The $changeStream stage is only supported on replica sets")
+
+    mongomock.collection.Collection.watch = no_change_streams
+    mongo = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: mongo
+
+    fake = FakeAzureOpenAI(latency_scale=latency_scale, seed=seed, profile=profile)
+    openai.AzureOpenAI = lambda *args, **kwargs: fake
+
+    mongo[BENCH_ENV["RECOMMENDER_DB_NAME"]][BENCH_ENV["RECOMMENDER_COLLECTION_NAME"]].insert_many(
+        synthetic_catalog(catalog_size, seed)
+    )
+
+    import main_flask
+    return main_flask, fake
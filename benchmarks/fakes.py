@@ -0,0 +1,192 @@
+"""Offline stand-in for the AzureOpenAI client.
+
+Covers what the agents use: ``chat.completions.create`` (plain and
+streamed) and the assistants ``beta.threads`` create_and_run / runs /
+messages calls. Each call is classified from its prompt, sleeps for a
+latency drawn from that kind's profile and answers in the shape the
+calling agent expects, so the whole chain runs end to end.
+"""
+import itertools
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from agents.tokens import count_tokens
+
+# Kind -> (mean latency seconds, completion tokens). Rough gpt-4o figures; override per run.
+DEFAULT_PROFILE = {
+    "gatekeeper": (0.8, 25),
+    "recommender": (2.5, 220),
+    "report": (3.0, 180),
+    "follow_up": (1.2, 60),
+    "summarizer": (2.0, 300),
+    "pricing": (6.0, 150),
+    "chat": (1.0, 50),
+}
+
+KIND_MARKERS = (
+    ("recommender", "recommend the best AI models"),
+    ("gatekeeper", "focused ONLY on recommending AI models"),
+    ("report", "final selection reports"),
+    ("follow_up", "previously recommended a model"),
+    ("summarizer", "partial summaries"),
+    ("summarizer", "You are condensing part"),
+)
+FILLER = "The model fits the workload well given its accuracy, latency and price profile".split()
+
+
+def _usage(prompt_tokens, completion_tokens):
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens
+    )
+
+
+def _filler(tokens):
+    return " ".join(itertools.islice(itertools.cycle(FILLER), max(tokens, 0)))
+
+
+def _table_rows(text, start, end):
+    """First-column values of the pipe table between two markers."""
+    section = text.split(start, 1)[-1].split(end, 1)[0]
+    rows = [line.split("|")[0].strip() for line in section.strip().splitlines()[1:]]
+    return [row for row in rows if row]
+
+
+class FakeAzureOpenAI:
+    """Drop-in for ``openai.AzureOpenAI`` with configurable latency and token profiles.
+
+    ``latency_scale`` multiplies every profile latency (0 disables sleeping);
+    ``jitter`` is the relative spread of the latency draw. With
+    ``rename_pricing_models`` the pricing assistant writes model names the way
+    the real one often does ("Whisper-Large-v3" -> "Whisper Large v3 (Azure)").
+    """
+
+    def __init__(self, *args, profile=None, latency_scale=1.0, jitter=0.2, seed=0,
+                 rename_pricing_models=False, **kwargs):
+        self.profile = {**DEFAULT_PROFILE, **(profile or {})}
+        self.rename_pricing_models = rename_pricing_models
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._ids = itertools.count(1)
+        self.calls = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.beta = SimpleNamespace(threads=SimpleNamespace(
+            create_and_run=self._create_and_run,
+            runs=SimpleNamespace(retrieve=self._retrieve_run, cancel=self._cancel_run),
+            messages=SimpleNamespace(list=self._list_messages)
+        ))
+
+    # ===== Helpers =====
+    def _latency(self, kind):
+        mean = self.profile[kind][0] * self.latency_scale
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            return max(0.0, self._rng.gauss(mean, mean * self.jitter))
+
+    @staticmethod
+    def _kind(messages):
+        system = " ".join(m["content"] for m in messages if m["role"] == "system")
+        return next((kind for kind, marker in KIND_MARKERS if marker in system), "chat")
+
+    def _answer(self, kind, messages):
+        prompt = "\n".join(m["content"] for m in messages)
+        tokens = self.profile[kind][1]
+        if kind == "gatekeeper":
+            return "Great, I will now suggest the most suitable AI models for your case. ##PROCEED##"
+        if kind == "recommender":
+            names = _table_rows(prompt, "Model Dataset:\n", "\n\nInstructions")[:4]
+            reason = _filler(tokens // max(len(names), 1))
+            return "[" + ",".join(f'{{"Model Name": "{name}", "Reason": "{reason}"}}' for name in names) + "]"
+        if kind == "report":
+            names = _table_rows(prompt, "Recommended Models (from Recommender):\n", "\n\n3.")
+            return (
+                "Final Best Model Recommended:\n"
+                f"1. Model Name      : {names[0] if names else 'Unknown'}\n"
+                "2. Price           : $0.01 per 1K tokens\n"
+                "3. Speed           : Fast\n"
+                "4. Accuracy        : 92.5%\n"
+                "5. Cloud           : Azure\n"
+                "6. Region          : Global\n"
+                f"7. Reason for Selection : {_filler(tokens - 60)}"
+            )
+        return _filler(tokens)
+
+    # ===== Chat completions =====
+    def _create_completion(self, model=None, messages=(), stream=False, **kwargs):
+        kind = self._kind(messages)
+        latency = self._latency(kind)
+        content = self._answer(kind, messages)
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        if stream:
+            return self._stream(content, latency)
+        time.sleep(latency)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason="stop")],
+            usage=_usage(prompt_tokens, count_tokens(content))
+        )
+
+    @staticmethod
+    def _stream(content, latency):
+        pieces = re.findall(r"\S+\s*", content) or [content]
+        # Azure opens with a chunk carrying only content-filter results; time to first token is ~1/3.
+        time.sleep(latency / 3)
+        yield SimpleNamespace(choices=[])
+        per_piece = (latency * 2 / 3) / len(pieces)
+        for piece in pieces:
+            time.sleep(per_piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    # ===== Assistants (PricingAgent) =====
+    def _create_and_run(self, assistant_id=None, thread=None, **kwargs):
+        prompt = thread["messages"][0]["content"]
+        models = re.findall(r"^- (.+)$", prompt.split("Models to analyze:", 1)[-1], re.MULTILINE)
+        if self.rename_pricing_models:
+            models = [f"{name.replace('-', ' ')} (Azure)" for name in models]
+        run_id, thread_id = f"run_{next(self._ids)}", f"thread_{next(self._ids)}"
+        rows = "\n".join(f"| {name} | 0.0{i + 1} | per 1K tokens | Azure | Global |" for i, name in enumerate(models))
+        reply = (
+            "| Model | Estimated Price | Price Unit | Provider | Region |\n"
+            "|-------|------------------|------------|----------|--------|\n" + rows
+        )
+        due = time.monotonic() + self._latency("pricing")
+        with self._lock:
+            self._runs[run_id] = {
+                "thread_id": thread_id,
+                "due": due,
+                "status": "queued",
+                "reply": reply,
+                "usage": _usage(count_tokens(prompt), count_tokens(reply)),
+            }
+            return self._run_view(run_id)
+
+    def _run_view(self, run_id):
+        run = self._runs[run_id]
+        if run["status"] in ("queued", "in_progress"):
+            run["status"] = "completed" if time.monotonic() >= run["due"] else "in_progress"
+        return SimpleNamespace(
+            id=run_id,
+            thread_id=run["thread_id"],
+            status=run["status"],
+            usage=run["usage"] if run["status"] == "completed" else None
+        )
+
+    def _retrieve_run(self, thread_id=None, run_id=None, **kwargs):
+        with self._lock:
+            return self._run_view(run_id)
+
+    def _cancel_run(self, thread_id=None, run_id=None, **kwargs):
+        with self._lock:
+            self._runs[run_id]["status"] = "cancelled"
+            return self._run_view(run_id)
+
+    def _list_messages(self, thread_id=None, run_id=None, **kwargs):
+        with self._lock:
+            reply = self._runs[run_id]["reply"]
+        text = SimpleNamespace(type="text", text=SimpleNamespace(value=reply))
+        return SimpleNamespace(data=[SimpleNamespace(role="assistant", content=[text])])
@@ -0,0 +1,301 @@
+"""Open-loop load generator and traffic replayer for the Flask endpoints.
+
+    # Against a running deployment, stepping the arrival rate to find saturation
+    python -m benchmarks.load --url https://final-agent-ui.onrender.com --rates 0.5,1,2,4 --step-seconds 60
+
+    # Against a local copy wired to the fake OpenAI client and mongomock
+    python -m benchmarks.load --local --rates 2,5,10,20 --step-seconds 20
+
+    # Replay exported chat history (mongoexport --jsonArray, or JSON lines)
+    python -m benchmarks.load --local --replay chats.json --rates 5
+
+Sessions arrive as a Poisson process at each step's rate, whether or not
+earlier ones have finished, so queueing shows up as latency. At most
+``--concurrency`` sessions run at once; arrivals beyond that wait, and the
+wait counts toward their session latency. A session is: signup + login, an
+optional /upload (txt, csv, json or png), a first /chat turn, follow-ups,
+then /history. Replay mode takes the messages from the export instead,
+grouped per user, in timestamp order.
+
+A step is saturated when the server falls behind: sessions still
+queued or running when arrivals stop take longer to drain than the first
+step's session p95 plus 10% of the step length. It also counts as
+saturated when the error rate passes 5% or /chat p95 more than doubles
+versus the first step.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import socket
+import string
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import requests
+
+from benchmarks.run import RESULTS_DIR, percentile
+
+TASKS = [
+    "I need to summarize long legal contracts for our paralegals",
+    "We want to transcribe customer support calls in English and Hindi",
+    "Generate product images for an online furniture store",
+    "Translate technical manuals from German to English",
+    "Extract fields from scanned invoices with OCR",
+    "Build a chatbot that answers HR policy questions",
+    "Classify incoming emails by sentiment and urgency",
+    "Write unit tests and code reviews for a Python codebase",
+]
+FOLLOW_UPS = [
+    "What's the price?",
+    "Is it available in India?",
+    "Who provides it?",
+    "How fast is it?",
+    "Why is it better than the alternatives for my case?",
+]
+# 1x1 transparent PNG.
+PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==")
+
+
+def synthetic_file(rng):
+    kind = rng.choice(["txt", "csv", "json", "png"])
+    if kind == "txt":
+        body = ("Requirement notes: we process about 20k documents a month, need EU hosting, "
+                "budget under $500 per month, latency under two seconds.\n" * rng.randint(1, 40)).encode()
+    elif kind == "csv":
+        rows = ["ticket_id,channel,minutes,language"] + [
+            f"{i},{rng.choice(['phone', 'chat', 'email'])},{rng.randint(1, 60)},{rng.choice(['en', 'hi', 'de'])}"
+            for i in range(rng.randint(10, 2000))
+        ]
+        body = "\n".join(rows).encode()
+    elif kind == "json":
+        body = json.dumps({"use_case": rng.choice(TASKS), "monthly_volume": rng.randint(100, 100000),
+                           "regions": rng.sample(["US", "EU", "IN"], 2)}).encode()
+    else:
+        body = PNG
+    return f"load-{rng.randint(0, 10 ** 9)}.{kind}", body
+
+
+def synthetic_sessions(rng, follow_ups=(0, 2), upload_share=0.3):
+    while True:
+        yield {
+            "messages": [rng.choice(TASKS) + f" (ref {rng.randint(0, 10 ** 6)})"]
+            + rng.sample(FOLLOW_UPS, rng.randint(*follow_ups)),
+            "upload": synthetic_file(rng) if rng.random() < upload_share else None,
+        }
+
+
+def replay_sessions(path):
+    """Group exported chat turns into per-user sessions, in timestamp order."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    docs = json.loads(text) if text.startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def ts(doc):
+        value = doc.get("timestamp")
+        return str(value.get("$date", "")) if isinstance(value, dict) else str(value or "")
+
+    by_user = defaultdict(list)
+    for doc in sorted(docs, key=ts):
+        if doc.get("message"):
+            # Stored messages carry the extracted file text; replay only the typed part.
+            by_user[doc.get("username", "")].append(doc["message"].split("\n\n--- File Content Extracted ---")[0])
+    sessions = [{"messages": messages, "upload": None} for messages in by_user.values()]
+    if not sessions:
+        raise SystemExit(f"No chat turns found in {path}")
+    while True:
+        yield from sessions
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions = 0
+        self.session_latencies = []
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def finish_session(self, seconds):
+        with self._lock:
+            self.sessions += 1
+            self.session_latencies.append(seconds)
+
+    def summary(self):
+        endpoints = {}
+        for endpoint, values in sorted(self.samples.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(values), 4),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+            }
+        return endpoints
+
+
+def run_session(session, base_url, recorder, timeout, arrived):
+    http = requests.Session()
+    user = "load-" + "".join(random.choices(string.ascii_lowercase + string.digits, k=12))
+
+    def call(endpoint, method, path, **kwargs):
+        begin = time.perf_counter()
+        try:
+            response = http.request(method, base_url + path, timeout=timeout, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        recorder.record(endpoint, time.perf_counter() - begin, ok)
+        return response if ok else None
+
+    try:
+        credentials = {"username": user, "email": f"{user}@example.com", "password": "load-test"}
+        call("/signup", "POST", "/signup", json=credentials)
+        call("/login", "POST", "/login", json={"username": user, "password": "load-test"})
+
+        document_id = None
+        if session["upload"]:
+            name, body = session["upload"]
+            uploaded = call("/upload", "POST", "/upload", files={"file": (name, io.BytesIO(body))})
+            document_id = uploaded.json().get("document_id") if uploaded is not None else None
+
+        for turn, message in enumerate(session["messages"]):
+            payload = {"username": user, "message": message}
+            if turn == 0 and document_id:
+                payload["document_id"] = document_id
+            call("/chat" if turn == 0 else "/chat (follow-up)", "POST", "/chat", json=payload)
+
+        call("/history", "GET", f"/history/{user}?limit=25")
+    finally:
+        http.close()
+        recorder.finish_session(time.perf_counter() - arrived)
+
+
+def run_step(sessions, rate, seconds, concurrency, base_url, timeout, rng):
+    recorder = Recorder()
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    started = time.perf_counter()
+    next_arrival = started
+    offered = 0
+    while next_arrival - started < seconds:
+        time.sleep(max(0.0, next_arrival - time.perf_counter()))
+        pool.submit(run_session, next(sessions), base_url, recorder, timeout, time.perf_counter())
+        offered += 1
+        next_arrival += rng.expovariate(rate)
+    pool.shutdown(wait=True)
+    elapsed = time.perf_counter() - started
+
+    endpoints = recorder.summary()
+    requests_total = sum(e["requests"] for e in endpoints.values())
+    errors_total = sum(e["errors"] for e in endpoints.values())
+    session_latencies = sorted(recorder.session_latencies)
+    return {
+        "offered_rate": rate,
+        "sessions_offered": offered,
+        "achieved_rate": round(recorder.sessions / elapsed, 3),
+        "drain_seconds": round(elapsed - seconds, 1),
+        "error_rate": round(errors_total / requests_total, 4) if requests_total else 0.0,
+        "session_p50_ms": round(percentile(session_latencies, 0.50) * 1000, 1),
+        "session_p95_ms": round(percentile(session_latencies, 0.95) * 1000, 1),
+        "endpoints": endpoints,
+    }
+
+
+def saturated(step, first, step_seconds):
+    chat, first_chat = step["endpoints"].get("/chat"), first["endpoints"].get("/chat")
+    reasons = []
+    # An unsaturated server finishes the last arrivals within about one normal session time.
+    allowance = first["session_p95_ms"] / 1000 + 0.1 * step_seconds
+    if step["drain_seconds"] > allowance:
+        reasons.append(f"backlog took {step['drain_seconds']}s to drain after arrivals stopped (allowance {allowance:.1f}s)")
+    if step["error_rate"] > 0.05:
+        reasons.append(f"error rate {step['error_rate']:.1%}")
+    if chat and first_chat and step is not first and chat["p95_ms"] > 2 * first_chat["p95_ms"]:
+        reasons.append(f"/chat p95 {chat['p95_ms']} ms > 2x {first_chat['p95_ms']} ms")
+    return reasons
+
+
+def serve_local(latency_scale):
+    """Boot main_flask on fakes and serve it from a threaded werkzeug server; returns its base URL."""
+    from werkzeug.serving import make_server
+    from benchmarks.environment import boot
+
+    main_flask, _ = boot(latency_scale=latency_scale)
+    main_flask.document_store.upload_dir = tempfile.mkdtemp(prefix="load-uploads-")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = make_server("127.0.0.1", port, main_flask.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="load-server", daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running deployment")
+    target.add_argument("--local", action="store_true", help="serve main_flask locally on fake OpenAI + mongomock")
+    parser.add_argument("--rates", default="1,2,4", help="comma-separated session arrival rates per second")
+    parser.add_argument("--step-seconds", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=64, help="max sessions in flight")
+    parser.add_argument("--replay", help="exported chats collection (JSON array or JSON lines)")
+    parser.add_argument("--upload-share", type=float, default=0.3)
+    parser.add_argument("--latency-scale", type=float, default=0.05, help="fake model latency multiplier (--local)")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-stop", action="store_true", help="keep stepping after saturation")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    if args.local:
+        import logging
+        base_url = serve_local(args.latency_scale)
+        for handler in logging.getLogger().handlers:
+            handler.setLevel(logging.WARNING)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    else:
+        base_url = args.url.rstrip("/")
+    sessions = replay_sessions(args.replay) if args.replay else synthetic_sessions(rng, upload_share=args.upload_share)
+
+    steps, saturation = [], None
+    for rate in [float(r) for r in args.rates.split(",")]:
+        step = run_step(sessions, rate, args.step_seconds, args.concurrency, base_url, args.timeout, rng)
+        steps.append(step)
+        reasons = saturated(step, steps[0], args.step_seconds)
+        step["saturated"] = reasons
+        print(f"\n== {rate}/s offered: {step['achieved_rate']}/s achieved, errors {step['error_rate']:.1%}, "
+              f"session p50 {step['session_p50_ms']} ms, p95 {step['session_p95_ms']} ms")
+        for endpoint, e in step["endpoints"].items():
+            print(f"   {endpoint:20} n={e['requests']:5}  p50 {e['p50_ms']:9.1f}  p95 {e['p95_ms']:9.1f}  "
+                  f"p99 {e['p99_ms']:9.1f} ms  errors {e['error_rate']:.1%}")
+        if reasons:
+            print(f"   ⚠️ saturated: {'; '.join(reasons)}")
+            saturation = saturation or rate
+            if not args.no_stop:
+                break
+
+    print(f"\nSaturation at {saturation}/s offered." if saturation else "\nNo saturation within the tested rates.")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(RESULTS_DIR, f"load-{stamp}.json")
+    with open(path, "w") as f:
+        json.dump({"timestamp": stamp, "target": "local" if args.local else base_url,
+                   "config": vars(args), "saturation_rate": saturation, "steps": steps}, f, indent=2)
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
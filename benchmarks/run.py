@@ -0,0 +1,181 @@
+"""Offline benchmark runner.
+
+    python -m benchmarks.run                      # every scenario, compared to the previous run
+    python -m benchmarks.run -k http. -n 50 -c 8  # only endpoint scenarios, 8 at a time
+    python -m benchmarks.run --latency-scale 1    # full simulated model latency
+
+Results are written to benchmarks/results/<timestamp>.json. Each run is
+compared against ``--baseline`` (default: the newest earlier result), and
+p50/p95 or throughput changes beyond ``--threshold`` are flagged.
+"""
+import argparse
+import fnmatch
+import glob
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = (len(sorted_values) - 1) * q
+    low = int(index)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (index - low)
+
+
+def run_scenario(fn, iterations, concurrency, warmup):
+    for i in range(warmup):
+        fn(-1 - i)
+
+    latencies, errors = [], []
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            fn(i)
+        except Exception as e:
+            errors.append(repr(e))
+        latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(iterations)))
+    wall = time.perf_counter() - started
+
+    # tracemalloc slows allocation-heavy code by an order of magnitude, so memory
+    # comes from one extra traced call rather than from the timed iterations.
+    tracemalloc.start()
+    try:
+        fn(iterations)
+    except Exception:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "throughput_rps": round(iterations / wall, 2),
+        "peak_memory_kb_per_call": round(peak / 1024, 1),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def _previous_result(exclude):
+    # load-*.json files in the same directory come from benchmarks.load.
+    paths = sorted(
+        p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json"))
+        if p != exclude and not os.path.basename(p).startswith("load-")
+    )
+    return paths[-1] if paths else None
+
+
+def compare(current, baseline, threshold):
+    """Print per-scenario deltas; return the names of regressed scenarios."""
+    regressed = []
+    print(f"\nCompared with {baseline['timestamp']} ({baseline.get('git_commit') or 'unknown commit'}):")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        deltas = []
+        flagged = False
+        for key, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("throughput_rps", False)):
+            if not before[key]:
+                continue
+            change = (result[key] - before[key]) / before[key]
+            worse = change > threshold if higher_is_worse else change < -threshold
+            flagged |= worse
+            deltas.append(f"{key} {change:+.1%}{' !' if worse else ''}")
+        if flagged:
+            regressed.append(name)
+        print(f"  {name:28} {'  '.join(deltas)}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--scenarios", nargs="*", default=["*"], help="scenario name patterns (fnmatch)")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--latency-scale", type=float, default=0.05, help="multiplier on the fake model latencies")
+    parser.add_argument("--catalog-size", type=int, default=200)
+    parser.add_argument("--baseline", help="result file to compare against (default: previous run)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+
+    from benchmarks.environment import boot
+    main_flask, fake = boot(latency_scale=args.latency_scale, catalog_size=args.catalog_size)
+    # Keep agent file logging (it is part of the cost) but quiet the console.
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.WARNING)
+    from benchmarks.scenarios import build_scenarios
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    scenarios = build_scenarios(main_flask, workdir)
+    selected = [name for name in scenarios if any(fnmatch.fnmatch(name, f"*{p}*") for p in args.scenarios)]
+
+    results = {}
+    for name in selected:
+        results[name] = run_scenario(scenarios[name], args.iterations, args.concurrency, args.warmup)
+        r = results[name]
+        print(f"{name:28} p50 {r['p50_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms  p99 {r['p99_ms']:9.2f} ms  "
+              f"{r['throughput_rps']:8.2f} req/s  peak {r['peak_memory_kb_per_call']:9.1f} KiB  errors {r['errors']}")
+    main_flask.chat_writer.close()
+
+    current = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "fail_on_regression", "no_save")},
+        "llm_calls": fake.calls,
+        "scenarios": results,
+    }
+
+    path = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{current['timestamp']}.json")
+        with open(path, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nSaved {path}")
+
+    baseline_path = args.baseline or _previous_result(exclude=path)
+    regressed = []
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressed = compare(current, json.load(f), args.threshold)
+    if regressed:
+        print(f"\nRegressed beyond {args.threshold:.0%}: {', '.join(regressed)}")
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
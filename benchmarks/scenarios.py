@@ -0,0 +1,131 @@
+"""Benchmark scenarios: each agent on its own, then the Flask endpoints end to end.
+
+Every scenario is a callable taking the iteration number. It returns
+nothing on success and raises on failure (including non-2xx responses).
+"""
+import csv
+import os
+import random
+
+
+def _write_csv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "region", "latency_ms", "tokens", "label"])
+        for i in range(rows):
+            writer.writerow([i, rng.choice(["US", "EU", "IN"]), round(rng.uniform(50, 900), 1),
+                             rng.randint(10, 4000), rng.choice(["spam", "ham", "unknown"])])
+    return path
+
+
+def _check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def _expect_priced_once(table, names):
+    for name in names:
+        rows = [line for line in table.splitlines() if line.startswith(f"| {name} |")]
+        if len(rows) != 1 or "Pricing unavailable" in rows[0]:
+            raise AssertionError(f"expected one priced row for {name}:\n{table}")
+    if table.count("\n") != len(names) + 1:
+        raise AssertionError(f"unexpected extra rows:\n{table}")
+
+
+def build_scenarios(main_flask, workdir, csv_rows=20000):
+    from agents.chat_agent import ChatAgent
+    from agents.file_readers import read_file
+    from agents.pricing_agent import PricingAgent
+    from agents.pricing_cache import PricingCache
+    from agents.report_agent import ReportAgent
+    from agents.requir_recommender_agent import RecommenderAgent
+    from benchmarks.fakes import FakeAzureOpenAI
+
+    client = main_flask.gpt_client
+    catalog = main_flask.get_model_catalog()
+    models = catalog.get_models()
+    names = [m["Model_name"] for m in models[:3]]
+    recommended = [{"Model Name": name, "Reason": "Fits the task."} for name in names]
+    pricing_table = main_flask.pricing_agent.analyze_pricing(recommended)
+    csv_path = _write_csv(os.path.join(workdir, "bench.csv"), csv_rows)
+    http = main_flask.app.test_client()
+
+    def gatekeeper(i):
+        ChatAgent(client).process_web_input(f"Our team gets thousands of vendor invoices, batch {i}")
+
+    def intent_local(i):
+        ChatAgent(client, intent_classifier=main_flask.intent_classifier).process_web_input(
+            f"Summarize long legal contracts for batch {i}"
+        )
+
+    def recommender(i):
+        RecommenderAgent(client).recommend_models(f"I need a speech to text model to transcribe support calls {i}")
+
+    def pricing_cold(i):
+        agent = PricingAgent(client, main_flask.assistant_id)
+        agent.analyze_pricing(recommended)
+
+    def pricing_renamed(i):
+        # The assistant rewrites names; rows must still land on (and be cached under) the requested ones.
+        renaming = FakeAzureOpenAI(latency_scale=0, rename_pricing_models=True)
+        agent = PricingAgent(renaming, main_flask.assistant_id, pricing_cache=PricingCache())
+        for _ in range(2):
+            _expect_priced_once(agent.analyze_pricing(recommended), names)
+        if renaming.calls.get("pricing") != 1:
+            raise AssertionError(f"assistant called {renaming.calls.get('pricing')} times, expected 1")
+
+    def pricing_cached(i):
+        main_flask.pricing_agent.analyze_pricing(recommended)
+
+    def report(i):
+        ReportAgent(client).generate_report(f"Transcribe support calls {i}", recommended, pricing_table)
+
+    def follow_up_template(i):
+        agent = ChatAgent(client)
+        agent.set_selected_model(models[0])
+        agent.set_last_user_task("Transcribe support calls")
+        agent.handle_follow_up("What's the price?")
+
+    def follow_up_llm(i):
+        agent = ChatAgent(client)
+        agent.set_selected_model(models[0])
+        agent.set_last_user_task("Transcribe support calls")
+        agent.handle_follow_up(f"Why is it better than the alternatives for case {i}?")
+
+    def file_read_csv(i):
+        read_file(csv_path)
+
+    def chat(i):
+        _check(http.post("/chat", json={"username": f"bench-chat-{i}",
+                                        "message": f"Recommend a model to summarize support tickets, case {i}"}))
+
+    def chat_cached(i):
+        _check(http.post("/chat", json={"username": f"bench-cached-{i}",
+                                        "message": "Recommend a model to translate product manuals"}))
+
+    def chat_stream(i):
+        response = _check(http.post("/chat/stream", json={"username": f"bench-stream-{i}",
+                                                          "message": f"Generate product images for listing {i}"}))
+        response.get_data()
+
+    def history(i):
+        _check(http.get("/history/bench-chat-0?limit=25"))
+
+    return {
+        "agent.gatekeeper": gatekeeper,
+        "agent.intent_local": intent_local,
+        "agent.recommender": recommender,
+        "agent.pricing_cold": pricing_cold,
+        "agent.pricing_renamed": pricing_renamed,
+        "agent.pricing_cached": pricing_cached,
+        "agent.report": report,
+        "agent.follow_up_template": follow_up_template,
+        "agent.follow_up_llm": follow_up_llm,
+        "agent.file_read_csv": file_read_csv,
+        "http.chat": chat,
+        "http.chat_cached": chat_cached,
+        "http.chat_stream": chat_stream,
+        "http.history": history,
+    }
@@ -2,38 +2,114 @@ import React, { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { Paperclip, Send } from "lucide-react";
 
+// Passing limit selects the paginated {messages, next_cursor} response from /history.
+const HISTORY_PAGE_SIZE = 25;
+
+const STAGE_LABELS = {
+  file: "Reading your file...",
+  gatekeeper: "Finding suitable models...",
+  recommender: "Estimating pricing...",
+  pricing: "Writing the report...",
+  report: "Finishing up...",
+};
+
+// POST to the streaming chat endpoint and dispatch each Server-Sent Event
+// to the matching handler (stage / token / result).
+const streamChat = async (payload, handlers) => {
+  const res = await fetch("/chat/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+
+  if (!res.ok || !res.body) {
+    const data = await res.json().catch(() => ({}));
+    handlers.result({ body: data });
+    return;
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (data && handlers[event]) handlers[event](JSON.parse(data));
+    }
+  }
+};
+
 const ChatWindow = ({ user, setUser }) => {
   const [message, setMessage] = useState("");
   const [chats, setChats] = useState([]);
   const [loading, setLoading] = useState(false);
   const [uploadedFile, setUploadedFile] = useState(null);
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [loadingHistory, setLoadingHistory] = useState(false);
   const scrollRef = useRef(null);
+  const listRef = useRef(null);
+  const prependRef = useRef(null);
   const textareaRef = useRef(null);
   const initialized = useRef(false);
   const isMobile = /Mobi|Android/i.test(navigator.userAgent);
 
+  // Fetch one page of history; older pages are prepended without moving the view.
+  const fetchHistory = async (username, before = null) => {
+    setLoadingHistory(true);
+    try {
+      const res = await axios.get(`/history/${username}`, { params: before ? { before, limit: HISTORY_PAGE_SIZE } : { limit: HISTORY_PAGE_SIZE } });
+      const page = res.data?.messages || [];
+      if (before) {
+        prependRef.current = listRef.current?.scrollHeight ?? null;
+        setChats((prev) => [...page, ...prev]);
+      } else {
+        setChats(page);
+      }
+      setHistoryCursor(res.data?.next_cursor || null);
+    } catch (err) {
+      console.error("Error fetching chat history:", err);
+    }
+    setLoadingHistory(false);
+  };
+
   useEffect(() => {
     if (initialized.current) return;
     const storedUser = localStorage.getItem("user");
     if (!user && storedUser) setUser(storedUser);
 
-    const fetchHistory = async () => {
-      try {
-        const res = await axios.get(`/history/${storedUser}`);
-        setChats(res.data || []);
-      } catch (err) {
-        console.error("Error fetching chat history:", err);
-      }
-    };
-
-    if (storedUser) fetchHistory();
+    if (storedUser) fetchHistory(storedUser);
     initialized.current = true;
   }, []);
 
   useEffect(() => {
+    if (prependRef.current !== null && listRef.current) {
+      listRef.current.scrollTop += listRef.current.scrollHeight - prependRef.current;
+      prependRef.current = null;
+      return;
+    }
     scrollRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [chats]);
 
+  const handleScroll = (e) => {
+    if (e.currentTarget.scrollTop < 80 && historyCursor && !loadingHistory) {
+      fetchHistory(user, historyCursor);
+    }
+  };
+
   const resetTextareaHeight = () => {
     const el = textareaRef.current;
     if (el) {
@@ -55,34 +131,54 @@ const ChatWindow = ({ user, setUser }) => {
     resetTextareaHeight();
     setLoading(true);
 
-    setChats((prev) => [...prev, { username: "System", message: "Analyzing..." }]);
-
-    try {
-      if (uploadedFile) {
-        const formData = new FormData();
-        formData.append("file", uploadedFile);
-        await axios.post("/upload", formData);
-      }
-
-      const res = await axios.post("/chat", {
-        username: user,
-        message: textMsg || fileMsg,
-      });
-
-      const formattedResponse = res.data?.response?.trim() || "⚠️ No proper response received.";
+    setChats((prev) => [...prev, { username: "System", message: "Analyzing...", pending: true }]);
 
+    // Replace the pending bubble in place: progress text while agents run,
+    // then the report as it streams in.
+    let streamed = "";
+    const updateAgentBubble = (text, isProgress) => {
       setChats((prev) => {
         const updated = [...prev];
-        const index = updated.findIndex(
-          (chat) => chat.username === "System" && chat.message === "Analyzing..."
-        );
+        const index = updated.findIndex((chat) => chat.pending);
+        const bubble = isProgress
+          ? { username: "System", message: text, pending: true }
+          : { username: "Agent", message: text, pending: true };
         if (index !== -1) {
-          updated[index] = { username: "Agent", message: formattedResponse };
+          updated[index] = bubble;
         } else {
-          updated.push({ username: "Agent", message: formattedResponse });
+          updated.push(bubble);
         }
         return updated;
       });
+    };
+
+    try {
+      let documentId = null;
+      if (uploadedFile) {
+        const formData = new FormData();
+        formData.append("file", uploadedFile);
+        const uploadRes = await axios.post("/upload", formData);
+        documentId = uploadRes.data?.document_id || null;
+      }
+
+      await streamChat(
+        { username: user, message: textMsg || fileMsg, document_id: documentId },
+        {
+          queued: ({ position }) =>
+            updateAgentBubble(`Waiting for ${position} earlier message${position > 1 ? "s" : ""}...`, true),
+          stage: ({ stage }) => {
+            if (!streamed) updateAgentBubble(STAGE_LABELS[stage] || "Analyzing...", true);
+          },
+          token: ({ text }) => {
+            streamed += text;
+            updateAgentBubble(streamed, false);
+          },
+          result: ({ body }) => {
+            const formattedResponse = body?.response?.trim() || "⚠️ No proper response received.";
+            updateAgentBubble(formattedResponse, false);
+          },
+        }
+      );
     } catch (err) {
       console.error("Send failed:", err);
       setChats((prev) => [
@@ -91,6 +187,7 @@ const ChatWindow = ({ user, setUser }) => {
       ]);
     }
 
+    setChats((prev) => prev.map(({ pending, ...chat }) => chat));
     setLoading(false);
   };
 
@@ -109,12 +206,14 @@ const ChatWindow = ({ user, setUser }) => {
     localStorage.removeItem("user");
     setUser(null);
     setChats([]);
+    setHistoryCursor(null);
   };
 
   const handleClear = async () => {
     try {
       await axios.post("/clear_chat", { username: user });
       setChats([]);
+      setHistoryCursor(null);
     } catch (err) {
       console.error("Clear failed:", err);
     }
@@ -147,7 +246,10 @@ const ChatWindow = ({ user, setUser }) => {
       </div>
 
       {/* Chat Window */}
-      <div className="flex-1 overflow-y-auto px-3 py-4 space-y-3">
+      <div ref={listRef} onScroll={handleScroll} className="flex-1 overflow-y-auto px-3 py-4 space-y-3">
+        {loadingHistory && historyCursor && (
+          <div className="text-center text-xs text-gray-500">Loading earlier messages...</div>
+        )}
         {chats.map((chat, index) => {
           const isUser = chat.username === user;
           const isAgent = chat.username === "Agent";
@@ -1,50 +1,155 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
-from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
 from dotenv import load_dotenv
-from openai import AzureOpenAI
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import re
+import json
+import time
+import threading
 import logging
 
 from agents.chat_agent import ChatAgent
 from agents.requir_recommender_agent import RecommenderAgent
 from agents.pricing_agent import PricingAgent
-from agents.report_agent import ReportAgent
+from agents.pricing_cache import PricingCache
+from agents.model_catalog import get_model_catalog
+from agents.response_cache import ResponseCache
+from agents.session_store import SessionStore
+from agents.user_queue import LocalUserQueue, MongoUserQueue, QUEUE_TIMEOUT_MESSAGE
+from agents.job_queue import JobManager, JobQueueFull
+from agents.ingestion import DocumentStore, ExtractionPending
+from agents.content_summarizer import ContentSummarizer
+from agents.chat_persistence import ChatWriter
+from agents.intent_classifier import FILE_CONTENT_MARKER, IntentClassifier
+from agents.tokens import start_usage_collection
+from agents import db
+from agents import llm_client
+from agents import metrics
+from agents.tracing import new_trace_id
+from agents.report_agent import ReportAgent, REPORT_ERROR_MESSAGE
 
 # ✅ Load .env
 load_dotenv()
 
 # ✅ Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 
 app = Flask(__name__, static_folder="frontend/dist", static_url_path="")
-CORS(app)
-
-# ✅ MongoDB
-mongo_client = MongoClient(os.getenv("MONGO_URI"))
-user_db = mongo_client[os.getenv("USER_DB_NAME")]
-users_col = user_db[os.getenv("USERS_COLLECTION_NAME")]
-chats_col = user_db[os.getenv("CHATS_COLLECTION_NAME")]
-
-# ✅ Azure OpenAI Client
-gpt_client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_KEY"),
-    api_version="2024-05-01-preview",
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    default_headers={"azure-openai-deployment": os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")}
+CORS(app, expose_headers=["X-Request-ID"])
+
+
+# ✅ Per-request trace id (propagated into every agent log line) and request latency
+@app.before_request
+def _start_trace():
+    g.trace_id = new_trace_id(request.headers.get("X-Request-ID"))
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def _finish_trace(response):
+    response.headers["X-Request-ID"] = g.trace_id
+    metrics.record_request(request.url_rule.rule if request.url_rule else "unmatched", response.status_code,
+                           time.perf_counter() - g.started)
+    return response
+
+# ✅ MongoDB (one pooled client shared with every agent; indexes ensured at startup)
+users_col = db.get_collection("users")
+chats_col = db.get_collection("chats")
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "25"))
+HISTORY_MAX_PAGE_SIZE = 100
+
+# ✅ Chat turns are written behind the request, in batches
+chat_writer = ChatWriter(
+    chats_col,
+    batch_size=int(os.getenv("CHAT_WRITE_BATCH_SIZE", "50")),
+    flush_interval=float(os.getenv("CHAT_WRITE_FLUSH_SECONDS", "1")),
+    clears=db.get_collection("chat_clears")
 )
+
+# ✅ Azure OpenAI Client (one pooled, rate-limited, retrying client shared with every agent)
+gpt_client = llm_client.get_client()
 assistant_id = os.getenv("AZURE_OPENAI_ASSISTANT_ID")
 
-# ✅ Global Chat Agent
-chat_agent = ChatAgent(gpt_client)
-chat_agent.selected_model_info = None
-chat_agent.last_user_task = None
+# ✅ Pricing Agent (shared client + per-model pricing cache)
+pricing_cache = PricingCache(
+    db.get_collection("pricing_cache"),
+    ttl_seconds=int(os.getenv("PRICING_CACHE_TTL_SECONDS", "86400"))
+)
+pricing_agent = PricingAgent(gpt_client, assistant_id, pricing_cache=pricing_cache)
+
+# ✅ Response cache for repeated requirements
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+    ttl_seconds=int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+)
 
-# ✅ Prevent parallel processing
-user_processing_lock = {}
+# ✅ Uploaded documents (deduplicated by content hash, extracted once)
+document_store = DocumentStore(
+    db.get_collection("documents"),
+    upload_dir="uploads",
+    max_workers=int(os.getenv("EXTRACTION_WORKERS", "2")),
+    claim_seconds=int(os.getenv("EXTRACTION_CLAIM_SECONDS", "600"))
+)
+EXTRACTION_WAIT_SECONDS = float(os.getenv("EXTRACTION_WAIT_SECONDS", "60"))
+FILE_PENDING_MESSAGE = "Your file is still being processed. Please send your message again in a moment."
+FILE_MISSING_MESSAGE = "We couldn't find that file. Please upload it again."
+
+# ✅ Oversized file content is condensed (map-reduce) before entering the agent chain
+content_summarizer = ContentSummarizer(
+    gpt_client,
+    max_tokens=int(os.getenv("FILE_CONTENT_MAX_TOKENS", "6000")),
+    chunk_tokens=int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000")),
+    max_workers=int(os.getenv("SUMMARY_WORKERS", "4")),
+    collection=db.get_collection("summaries")
+)
+
+# ✅ Per-user session state (follow-up context survives across workers)
+session_store = SessionStore(
+    db.get_collection("sessions"),
+    max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "1024"))
+)
+
+
+# ✅ Local intent classifier in front of the gatekeeper (trained on past decisions in the background)
+intent_classifier = IntentClassifier(
+    confidence=float(os.getenv("INTENT_CONFIDENCE", "0.9")),
+    min_examples=int(os.getenv("INTENT_MIN_EXAMPLES", "50")),
+    min_accuracy=float(os.getenv("INTENT_MIN_ACCURACY", "0.9")),
+    audit_rate=float(os.getenv("INTENT_AUDIT_RATE", "0.05"))
+)
+
+
+def _load_chat_agent(username):
+    agent = ChatAgent(gpt_client, summarizer=content_summarizer, intent_classifier=intent_classifier)
+    state = session_store.load(username)
+    agent.set_selected_model(state["selected_model_info"])
+    agent.set_last_user_task(state["last_user_task"])
+    return agent
+
+
+def _save_chat_agent(username, agent):
+    session_store.save(username, {
+        "selected_model_info": agent.selected_model_info,
+        "last_user_task": agent.last_user_task
+    })
+
+# ✅ Per-user request queue (one message at a time per user, in order)
+if os.getenv("USER_QUEUE_BACKEND", "local") == "mongo":
+    user_queue = MongoUserQueue(
+        db.get_collection("user_queue"),
+        lease_seconds=int(os.getenv("USER_QUEUE_LEASE_SECONDS", "180")),
+        heartbeat_seconds=int(os.getenv("USER_QUEUE_HEARTBEAT_SECONDS", "30"))
+    )
+else:
+    user_queue = LocalUserQueue()
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("USER_QUEUE_TIMEOUT_SECONDS", "300"))
+JOB_EVENT_POLL_SECONDS = float(os.getenv("JOB_EVENT_POLL_SECONDS", "0.5"))
 
 # ✅ Signup
 @app.route("/signup", methods=["POST"])
@@ -63,12 +168,16 @@ def signup():
     if users_col.find_one({"email": email}):
         return jsonify({"success": False, "message": "Email already registered"}), 409
 
-    users_col.insert_one({
-        "username": username,
-        "email": email,
-        "password": password,
-        "created_at": datetime.utcnow()
-    })
+    try:
+        users_col.insert_one({
+            "username": username,
+            "email": email,
+            "password": password,
+            "created_at": datetime.utcnow()
+        })
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup; the unique index caught it.
+        return jsonify({"success": False, "message": "Username or email already exists"}), 409
     return jsonify({"success": True, "message": "Account created"}), 201
 
 # ✅ Login
@@ -90,6 +199,200 @@ def login():
 
     return jsonify({"success": True, "message": "Login successful"}), 200
 
+# ✅ Chat pipeline (shared by the blocking and streaming endpoints)
+def _save_chat(username, message, response, timings=None, token_usage=None, intent=None, intent_source=None):
+    chat_writer.write({
+        "username": username,
+        "message": message,
+        "response": response,
+        "intent": intent,
+        "intent_source": intent_source,
+        "timings": timings or {},
+        "token_usage": token_usage or {},
+        "timestamp": datetime.utcnow()
+    })
+
+
+@metrics.timed("pipeline")
+def _chat_pipeline(username, message, file_path=None, stream_report=False, document_id=None):
+    """Run the agent chain for one message, yielding progress events.
+
+    Yields ``stage`` events as each agent finishes, ``token`` events for the
+    report text when ``stream_report`` is set, and always ends with a single
+    ``result`` event carrying the response body and HTTP status.
+    Per-stage timings (ms) and token usage are saved with the chat turn.
+    """
+    usage = start_usage_collection()
+    timings = {}
+    started = last = time.perf_counter()
+
+    def lap(stage):
+        nonlocal last
+        now = time.perf_counter()
+        timings[stage] = round((now - last) * 1000, 1)
+        last = now
+        return {"event": "stage", "stage": stage}
+
+    def save(response, intent=None, intent_source=None):
+        timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        _save_chat(username, message, response, timings, usage, intent, intent_source)
+
+    chat_agent = _load_chat_agent(username)
+
+    # ✅ Append file content if provided (pre-extracted at upload time when referenced by id)
+    if document_id:
+        try:
+            file_content = document_store.get_text(document_id, timeout=EXTRACTION_WAIT_SECONDS)
+        except ExtractionPending:
+            yield {"event": "result", "status": 503, "body": {"response": FILE_PENDING_MESSAGE}}
+            return
+        if file_content is None:
+            yield {"event": "result", "status": 404, "body": {"response": FILE_MISSING_MESSAGE}}
+            return
+        if file_content:
+            message += f"{FILE_CONTENT_MARKER}\n{content_summarizer.condense(file_content)}"
+        yield lap("file")
+    elif file_path and os.path.exists(file_path):
+        file_content = chat_agent._read_file_content(file_path)  # ✅ FIXED
+        message += f"{FILE_CONTENT_MARKER}\n{content_summarizer.condense(file_content)}"
+        yield lap("file")
+
+    # ✅ Handle follow-up
+    if chat_agent.selected_model_info and chat_agent.last_user_task:
+        followup_response = chat_agent.handle_follow_up(message)
+        lap("follow_up")
+        save(followup_response, "follow_up")
+        yield {"event": "result", "status": 200, "body": {"response": followup_response}}
+        return
+
+    # ✅ Serve repeated requirements from the response cache
+    catalog_version = get_model_catalog().current_version()
+    cached = response_cache.get(message, catalog_version)
+    if cached:
+        if cached["selected_model"]:
+            chat_agent.set_selected_model(cached["selected_model"])
+            # This user's requirement; the cached entry may have come from someone else's (similar) message.
+            chat_agent.last_user_task = message.strip()
+            _save_chat_agent(username, chat_agent)
+        yield lap("cache")
+        save(cached["response"], "cache")
+        yield {"event": "result", "status": 200, "body": {
+            "response": cached["response"],
+            "selected_model": cached["selected_model"]
+        }}
+        return
+
+    # ✅ Analyze input
+    chat_response = chat_agent.process_web_input(message)
+    yield lap("gatekeeper")
+
+    if not chat_response or not chat_response.get("proceed"):
+        response = chat_response.get("message", "Sorry, I couldn't understand your input.")
+        save(response, "hold", chat_response.get("intent_source"))
+        yield {"event": "result", "status": 200, "body": {"response": response}}
+        return
+
+    # ✅ Recommender (retrieval and report work from the user's requirement,
+    # not the gatekeeper's acknowledgement text)
+    analyzed_input = message.strip()
+    recommender = RecommenderAgent(gpt_client)
+    recommended = recommender.recommend_models(
+        analyzed_input,
+        alternative_mode=False,
+        exclude_model_name=chat_agent.selected_model_info.get("Model_name") if chat_agent.selected_model_info else None
+    )
+
+    if not recommended or not isinstance(recommended, list):
+        yield {"event": "result", "status": 500, "body": {"response": "Failed to get model recommendations."}}
+        return
+    yield lap("recommender")
+
+    # ✅ Pricing
+    pricing_table = pricing_agent.analyze_pricing(recommended)
+    yield lap("pricing")
+
+    # ✅ Report
+    reporter = ReportAgent(gpt_client)
+    if stream_report:
+        parts = []
+        for token in reporter.generate_report_stream(analyzed_input, recommended, pricing_table):
+            parts.append(token)
+            yield {"event": "token", "text": token}
+        final_output = "".join(parts).strip()
+    else:
+        final_output = reporter.generate_report(analyzed_input, recommended, pricing_table)
+    yield lap("report")
+
+    if reporter.failed:
+        # A fragment of a report: don't pick a model from it or cache it.
+        if stream_report:
+            yield {"event": "error", "message": REPORT_ERROR_MESSAGE}
+        save(REPORT_ERROR_MESSAGE, "proceed", chat_response.get("intent_source"))
+        yield {"event": "result", "status": 500, "body": {"response": REPORT_ERROR_MESSAGE}}
+        return
+
+    # ✅ Save selected model
+    matched = None
+    try:
+        model_name_match = re.search(r"Model Name\s*:\s*(.+)", final_output)
+        if model_name_match:
+            selected_name = model_name_match.group(1).strip()
+            matched = recommender.find_model(selected_name)
+            if matched:
+                chat_agent.set_selected_model(matched)
+                chat_agent.last_user_task = analyzed_input
+                _save_chat_agent(username, chat_agent)
+    except Exception as err:
+        print("⚠️ Model extraction failed:", err)
+
+    # ✅ Save chat
+    save(final_output, "proceed", chat_response.get("intent_source"))
+    if matched and reporter.completed:
+        # Only complete reports that resolved to a catalog model are worth replaying
+        response_cache.put(message, catalog_version, {
+            "response": final_output,
+            "selected_model": matched
+        })
+
+    yield {"event": "result", "status": 200, "body": {
+        "response": final_output,
+        "selected_model": chat_agent.selected_model_info
+    }}
+
+
+def _queued_pipeline(username, message, file_path=None, stream_report=False, document_id=None):
+    """Run ``_chat_pipeline`` once it is this user's turn.
+
+    Messages from the same user run one at a time, in arrival order, across
+    all workers. While waiting this yields ``queued`` events with the
+    current position.
+    """
+    ticket = user_queue.enter(username)
+    try:
+        deadline = time.monotonic() + QUEUE_TIMEOUT_SECONDS
+        last_position = None
+        position = user_queue.poll(ticket)
+        while position > 0:
+            if position != last_position:
+                yield {"event": "queued", "position": position}
+                last_position = position
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield {"event": "result", "status": 503, "body": {"response": QUEUE_TIMEOUT_MESSAGE}}
+                return
+            user_queue.wait(ticket, remaining)
+            position = user_queue.poll(ticket)
+
+        # The queue's heartbeat keeps the ticket's lease alive however long a stage takes.
+        yield from _chat_pipeline(username, message, file_path, stream_report, document_id)
+    finally:
+        user_queue.release(ticket)
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
 # ✅ Chat (with file analysis support)
 @app.route("/chat", methods=["POST"])
 def chat():
@@ -97,111 +400,181 @@ def chat():
     username = data.get("username")
     message = data.get("message", "")
     file_path = data.get("file_path", None)
+    document_id = data.get("document_id", None)
 
     if not username or not message:
         return jsonify({"response": "Missing username or message"}), 400
 
-    if user_processing_lock.get(username, False):
-        return jsonify({"response": "Please wait, your previous request is still being processed."}), 429
+    queue_position = 0
+    for event in _queued_pipeline(username, message, file_path, document_id=document_id):
+        if event["event"] == "queued":
+            queue_position = queue_position or event["position"]
+        elif event["event"] == "result":
+            body = event["body"]
+            if queue_position:
+                body["queue_position"] = queue_position
+            return jsonify(body), event["status"]
 
-    user_processing_lock[username] = True
 
-    try:
-        # ✅ Append file content if provided
-        if file_path and os.path.exists(file_path):
-            file_content = chat_agent._read_file_content(file_path)  # ✅ FIXED
-            message += f"\n\n--- File Content Extracted ---\n{file_content}"
-
-        # ✅ Handle follow-up
-        if chat_agent.selected_model_info and chat_agent.last_user_task:
-            followup_response = chat_agent.handle_follow_up(message)
-            chats_col.insert_one({
-                "username": username,
-                "message": message,
-                "response": followup_response,
-                "timestamp": datetime.utcnow()
-            })
-            return jsonify({"response": followup_response}), 200
-
-        # ✅ Analyze input
-        chat_response = chat_agent.process_web_input(message)
-
-        if not chat_response or not chat_response.get("proceed"):
-            response = chat_response.get("message", "Sorry, I couldn't understand your input.")
-            chats_col.insert_one({
-                "username": username,
-                "message": message,
-                "response": response,
-                "timestamp": datetime.utcnow()
-            })
-            return jsonify({"response": response}), 200
-
-        # ✅ Recommender
-        analyzed_input = chat_response["message"]
-        recommender = RecommenderAgent(gpt_client)
-        recommended = recommender.recommend_models(
-            analyzed_input,
-            alternative_mode=False,
-            exclude_model_name=chat_agent.selected_model_info.get("Model_name") if chat_agent.selected_model_info else None
-        )
-
-        if not recommended or not isinstance(recommended, list):
-            return jsonify({"response": "Failed to get model recommendations."}), 500
-
-        # ✅ Pricing
-        pricing_agent = PricingAgent(
-            assistant_id,
-            os.getenv("AZURE_OPENAI_KEY"),
-            os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
-        pricing_table = pricing_agent.analyze_pricing(recommended)
-
-        # ✅ Report
-        reporter = ReportAgent(gpt_client)
-        final_output = reporter.generate_report(analyzed_input, recommended, pricing_table)
+# ✅ Chat (Server-Sent Events streaming)
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    data = request.get_json()
+    username = data.get("username")
+    message = data.get("message", "")
+    file_path = data.get("file_path", None)
+    document_id = data.get("document_id", None)
 
-        # ✅ Save selected model
-        try:
-            model_name_match = re.search(r"Model Name\s*:\s*(.+)", final_output)
-            if model_name_match:
-                selected_name = model_name_match.group(1).strip()
-                all_models = recommender._fetch_model_dataset()
-                matched = next((m for m in all_models if m.get("Model_name") == selected_name), None)
-                if matched:
-                    chat_agent.set_selected_model(matched)
-                    chat_agent.last_user_task = analyzed_input
-        except Exception as err:
-            print("⚠️ Model extraction failed:", err)
-
-        # ✅ Save chat
-        chats_col.insert_one({
-            "username": username,
-            "message": message,
-            "response": final_output,
-            "timestamp": datetime.utcnow()
-        })
+    if not username or not message:
+        return jsonify({"response": "Missing username or message"}), 400
 
-        return jsonify({
-            "response": final_output,
-            "selected_model": chat_agent.selected_model_info
-        }), 200
+    def generate():
+        for event in _queued_pipeline(username, message, file_path, stream_report=True, document_id=document_id):
+            kind = event.pop("event")
+            yield _sse(kind, event)
 
-    finally:
-        user_processing_lock[username] = False
+    # Closing the generator (end of stream or client disconnect) releases the queue slot.
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
-# ✅ Chat History
+# ✅ Chat jobs (submit now, poll or stream the result later)
+job_manager = JobManager(
+    db.get_collection("jobs"),
+    # The manager holds the job's user-queue ticket and only hands it a thread once it is at the front.
+    runner=lambda job: _chat_pipeline(
+        job["username"], job["message"], job.get("file_path"), document_id=job.get("document_id")
+    ),
+    user_queue=user_queue,
+    queue_timeout=QUEUE_TIMEOUT_SECONDS,
+    max_workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_pending=int(os.getenv("JOB_MAX_PENDING", "100")),
+    # Live jobs heartbeat; only a job silent this long (its worker died) is re-run elsewhere.
+    stale_seconds=int(os.getenv("JOB_STALE_SECONDS", str(int(QUEUE_TIMEOUT_SECONDS) + 600))),
+    heartbeat_seconds=int(os.getenv("JOB_HEARTBEAT_SECONDS", "30")),
+    # A queued job whose worker stopped heartbeating this long is taken over by another worker.
+    orphan_seconds=int(os.getenv("JOB_ORPHAN_SECONDS", "90"))
+)
+
+
+def _job_view(job):
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "events": job.get("events", []),
+        "result": job.get("result"),
+        "error": job.get("error")
+    }
+
+
+@app.route("/chat/jobs", methods=["POST"])
+def submit_chat_job():
+    data = request.get_json()
+    username = data.get("username")
+    message = data.get("message", "")
+    file_path = data.get("file_path", None)
+    document_id = data.get("document_id", None)
+
+    if not username or not message:
+        return jsonify({"response": "Missing username or message"}), 400
+
+    try:
+        job_id = job_manager.submit(username, message, file_path, document_id)
+    except JobQueueFull:
+        return jsonify({"response": "Server is busy. Please try again shortly."}), 503
+
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+
+@app.route("/chat/jobs/<job_id>", methods=["GET"])
+def get_chat_job(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"status": "fail", "message": "Job not found"}), 404
+    return jsonify(_job_view(job)), 200
+
+
+@app.route("/chat/jobs/<job_id>/events", methods=["GET"])
+def stream_chat_job(job_id):
+    if not job_manager.get(job_id):
+        return jsonify({"status": "fail", "message": "Job not found"}), 404
+
+    def generate():
+        sent = 0
+        while True:
+            job = job_manager.get(job_id)
+            if not job:
+                return
+            events = job.get("events", [])
+            for event in events[sent:]:
+                event = dict(event)
+                yield _sse(event.pop("event"), event)
+            sent = len(events)
+
+            if job["status"] == "done":
+                result = dict(job["result"])
+                yield _sse(result.pop("event"), result)
+                return
+            if job["status"] == "failed":
+                yield _sse("result", {"status": 500, "body": {"response": "Sorry, something went wrong."}})
+                return
+            time.sleep(JOB_EVENT_POLL_SECONDS)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+# ✅ Chat History (newest page first; pass next_cursor back as ?before= for older turns)
+# Requests with neither ?limit nor ?before get the pre-pagination flat list (newest
+# HISTORY_MAX_PAGE_SIZE turns), so frontend bundles built before pagination keep working.
 @app.route("/history/<username>", methods=["GET"])
 def history(username):
+    legacy = "limit" not in request.args and "before" not in request.args
     if not username:
-        return jsonify([])
+        return jsonify([] if legacy else {"messages": [], "next_cursor": None})
 
-    chats = chats_col.find({"username": username})
-    return jsonify([
-        {"username": username, "message": c["message"]} if i % 2 == 0 else {"username": "Agent", "message": c["response"]}
-        for i, c in enumerate(chats)
-    ])
-
-# ✅ File Upload
+    try:
+        limit = HISTORY_MAX_PAGE_SIZE if legacy else max(1, min(int(request.args.get("limit", HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE))
+        query = {"username": username}
+        # Turns another worker still had queued when the user cleared the chat may land afterwards.
+        cleared_at = chat_writer.cleared_at(username)
+        if cleared_at:
+            query["timestamp"] = {"$gt": cleared_at}
+        before = request.args.get("before")
+        if before:
+            # Cursor is "<timestamp>,<_id>" so turns sharing the boundary timestamp aren't skipped.
+            timestamp, _, last_id = before.partition(",")
+            timestamp = datetime.fromisoformat(timestamp)
+            if last_id:
+                query["$or"] = [
+                    {"timestamp": {"$lt": timestamp}},
+                    {"timestamp": timestamp, "_id": {"$lt": ObjectId(last_id)}}
+                ]
+            else:
+                query.setdefault("timestamp", {})["$lt"] = timestamp
+    except (ValueError, InvalidId):
+        return jsonify({"status": "fail", "message": "Invalid limit or before cursor"}), 400
+
+    turns = list(
+        chats_col.find(query, {"message": 1, "response": 1, "timestamp": 1})
+        .sort([("timestamp", -1), ("_id", -1)])
+        .limit(limit)
+    )
+    turns.reverse()
+
+    messages = []
+    for turn in turns:
+        messages.append({"username": username, "message": turn.get("message", "")})
+        messages.append({"username": "Agent", "message": turn.get("response", "")})
+    if legacy:
+        return jsonify(messages)
+
+    next_cursor = f"{turns[0]['timestamp'].isoformat()},{turns[0]['_id']}" if len(turns) == limit else None
+    return jsonify({"messages": messages, "next_cursor": next_cursor})
+
+# ✅ File Upload (content-addressed; text extraction starts in the background)
 @app.route("/upload", methods=["POST"])
 def upload():
     file = request.files.get("file")
@@ -209,12 +582,15 @@ def upload():
         return jsonify({"status": "fail", "message": "No file uploaded"}), 400
 
     filename = secure_filename(file.filename)
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, filename)
-    file.save(file_path)
+    document_id, file_path, duplicate = document_store.ingest(file, filename)
 
-    return jsonify({"status": "success", "message": f"{filename} uploaded successfully", "file_path": file_path}), 200
+    return jsonify({
+        "status": "success",
+        "message": f"{filename} uploaded successfully",
+        "file_path": file_path,
+        "document_id": document_id,
+        "duplicate": duplicate
+    }), 200
 
 # ✅ Clear Chat
 @app.route("/clear_chat", methods=["POST"])
@@ -225,11 +601,26 @@ def clear_chat():
     if not username:
         return jsonify({"status": "fail", "message": "Missing username"}), 400
 
-    chats_col.delete_many({"username": username})
-    chat_agent.selected_model_info = None
-    chat_agent.last_user_task = None
+    # Through the writer, so this user's still-queued turns are inserted first and deleted too;
+    # the recorded clear time keeps turns queued in other workers out as well.
+    chat_writer.clear(username)
+    session_store.clear(username)
     return jsonify({"status": "cleared"}), 200
 
+# ✅ Health Check
+@app.route("/health", methods=["GET"])
+def health():
+    ok, latency_ms, error = db.ping()
+    body = {"status": "ok" if ok else "degraded", "mongo": {"ok": ok, "latency_ms": latency_ms}}
+    if error:
+        body["mongo"]["error"] = error
+    return jsonify(body), 200 if ok else 503
+
+# ✅ Prometheus metrics (all workers' series when METRICS_MULTIPROC_DIR is set)
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
 # ✅ Serve React Frontend
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
@@ -239,6 +630,25 @@ def serve_react(path):
         return send_from_directory(app.static_folder, path)
     return send_from_directory(app.static_folder, "index.html")
 
+# ✅ Background services (indexes, intent training, queue and job threads)
+def _start_background_services():
+    db.ensure_indexes()
+    threading.Thread(
+        target=intent_classifier.train_from_history,
+        args=(chats_col, int(os.getenv("INTENT_TRAINING_LIMIT", "5000"))),
+        name="intent-training",
+        daemon=True
+    ).start()
+    user_queue.start()
+    job_manager.start()
+    job_manager.resume_pending()
+
+
+# Extraction pool children re-import this script as __mp_main__ when it is run directly
+# (python main_flask.py); they must not build indexes, train or claim chat jobs.
+if __name__ != "__mp_main__":
+    _start_background_services()
+
 # ✅ Start App
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)